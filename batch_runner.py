@@ -0,0 +1,220 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List
+
+from engine import KnowledgeBase, Provenance, infer, load_shared_knowledge_base, normalize_gender
+
+# Basis pengetahuan milik proses worker, dimuat sekali oleh _init_worker
+_worker_kb = None
+
+
+def _init_worker(rules_file: str, data: Dict = None, version: str = None, compiled_path: str = None):
+    """
+    Inisialisasi proses worker: muat basis pengetahuan sekali per proses.
+    Jika `compiled_path` diberikan dan artefaknya masih berversi `version`,
+    worker memetakan artefak itu (halamannya dibagi dengan proses lain).
+    Jika `data` diberikan (isi rules.json yang sudah divalidasi), worker
+    memakai versi tersebut alih-alih membaca file yang mungkin sudah berubah.
+    """
+    global _worker_kb
+    if compiled_path is not None:
+        from kb_compiler import CompiledKnowledgeBase, MappedKnowledgeBase
+        try:
+            compiled = CompiledKnowledgeBase(compiled_path)
+        except (OSError, ValueError, KeyError):
+            compiled = None
+        if compiled is not None and compiled.version == version:
+            _worker_kb = MappedKnowledgeBase(compiled, rules_file)
+            return
+    if data is not None:
+        _worker_kb = KnowledgeBase(data, rules_file, version)
+    else:
+        _worker_kb = load_shared_knowledge_base(rules_file)
+
+
+def diagnose_records(kb, records: List[Dict], explain: bool = False) -> List[Dict]:
+    """
+    Mendiagnosa sekumpulan record pasien dan mengembalikan hasil berperingkat.
+    DAG asal-usul (provenance) disertakan untuk semua record jika explain=True,
+    atau hanya untuk record yang bertanda 'jelaskan'.
+    """
+    output = []
+    for record in records:
+        if 'error' in record:
+            output.append({'id': record.get('id'), 'error': record['error']})
+            continue
+        provenance = Provenance() if explain or record.get('jelaskan') else None
+        conclusions = infer(kb, record['gender'], record['facts'], provenance=provenance)
+        result = {
+            'id': record.get('id'),
+            'gender': record['gender'],
+            'hasil': [
+                {'kode': kode, 'nama': nama, 'cf': cf}
+                for kode, nama, cf in kb.diagnosis_results(conclusions)
+            ],
+        }
+        if provenance is not None:
+            result['provenance'] = provenance.to_dict()
+        output.append(result)
+    return output
+
+
+def _diagnose_chunk(records: List[Dict], explain: bool = False) -> List[Dict]:
+    """
+    Dijalankan di proses worker
+    """
+    return diagnose_records(_worker_kb, records, explain)
+
+
+def parse_record(raw: Dict, line_no: int) -> Dict:
+    """
+    Mengubah satu baris input (CSV atau JSONL) menjadi record
+    {'id', 'gender', 'facts'}. Kolom gejala yang kosong dianggap tidak ada.
+    Record dengan 'jelaskan' bernilai benar akan disertai DAG asal-usul.
+    """
+    if not isinstance(raw, dict):
+        return {'id': line_no, 'error': "Record harus berupa objek JSON"}
+    record_id = raw.get('id', line_no)
+    gender = normalize_gender(str(raw.get('gender', '') or ''))
+    if gender is None:
+        return {'id': record_id, 'error': f"Gender tidak valid: {raw.get('gender')!r}"}
+
+    if 'facts' in raw:
+        if not isinstance(raw['facts'], dict):
+            return {'id': record_id, 'error': "'facts' harus berupa objek {kode: cf}"}
+        items = raw['facts'].items()
+    else:
+        items = ((kode, value) for kode, value in raw.items() if kode not in ('id', 'gender', 'jelaskan'))
+
+    facts = {}
+    try:
+        for kode, value in items:
+            if value is None or value == '':
+                continue
+            facts[kode] = float(value)
+    except (TypeError, ValueError):
+        return {'id': record_id, 'error': f"CF tidak valid untuk gejala {kode}: {value!r}"}
+    record = {'id': record_id, 'gender': gender, 'facts': facts}
+    if raw.get('jelaskan') in (True, 1, '1', 'true', 'ya'):
+        record['jelaskan'] = True
+    return record
+
+
+def validate_record(kb, raw, line_no: int) -> Dict:
+    """
+    Mengurai (parse_record) dan memvalidasi satu record terhadap basis
+    pengetahuan: setiap kode fakta harus ada di tabel gejala dan CF harus
+    berupa angka berhingga di [-1, 1]. Dipakai bersama oleh batch_runner,
+    stream_pipeline dan service agar input yang sama diperlakukan sama.
+    """
+    record = parse_record(raw, line_no)
+    if 'error' in record:
+        return record
+    gejala = kb.indexes['gejala']
+    for kode, cf in record['facts'].items():
+        if kode not in gejala:
+            return {'id': record['id'], 'error': f"Kode gejala tidak dikenal: {kode}"}
+        if not math.isfinite(cf) or not -1.0 <= cf <= 1.0:
+            return {'id': record['id'], 'error': f"CF gejala {kode} harus di antara -1 dan 1: {cf}"}
+    return record
+
+
+def read_records(path: str, kb) -> Iterator[Dict]:
+    """
+    Membaca dan memvalidasi record pasien dari file CSV atau JSONL secara
+    bertahap. Path '-' berarti stdin (format JSONL).
+    """
+    if path == '-':
+        yield from _read_jsonl(sys.stdin, kb)
+        return
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        if path.lower().endswith('.csv'):
+            for line_no, row in enumerate(csv.DictReader(file), 1):
+                yield validate_record(kb, row, line_no)
+        else:
+            yield from _read_jsonl(file, kb)
+
+
+def _read_jsonl(file, kb) -> Iterator[Dict]:
+    for line_no, line in enumerate(file, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError:
+            yield {'id': line_no, 'error': "Baris JSON tidak valid"}
+            continue
+        yield validate_record(kb, raw, line_no)
+
+
+def _chunks(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(records: Iterable[Dict], rules_file: str = "rules.json",
+              workers: int = None, chunk_size: int = 500, explain: bool = False) -> Iterator[Dict]:
+    """
+    Mendiagnosa record secara paralel dengan ProcessPoolExecutor dan
+    mengalirkan hasil sesuai urutan input. Jumlah chunk yang sedang diproses
+    dibatasi sehingga memori tetap terbatas untuk input sebesar apa pun.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        kb = load_shared_knowledge_base(rules_file)
+        for chunk in _chunks(records, chunk_size):
+            yield from diagnose_records(kb, chunk, explain)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(rules_file,)) as executor:
+        pending = deque()
+        for chunk in _chunks(records, chunk_size):
+            pending.append(executor.submit(_diagnose_chunk, chunk, explain))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main():
+    """
+    Fungsi utama untuk menjalankan diagnosa batch dari file
+    """
+    parser = argparse.ArgumentParser(description="Diagnosa batch data skrining (CSV/JSONL)")
+    parser.add_argument('input', help="file CSV/JSONL berisi gender dan CF gejala, '-' untuk stdin")
+    parser.add_argument('--output', '-o', default='-', help="file JSONL hasil, default stdout")
+    parser.add_argument('--rules', default='rules.json', help="file basis pengetahuan")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah proses worker")
+    parser.add_argument('--chunk-size', type=int, default=500, help="jumlah record per tugas worker")
+    parser.add_argument('--jelaskan', action='store_true', help="sertakan DAG asal-usul setiap diagnosa")
+    args = parser.parse_args()
+
+    kb = load_shared_knowledge_base(args.rules)
+    if kb.compiled is None and not kb.data:
+        sys.exit(1)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        results = run_batch(read_records(args.input, kb), args.rules, args.workers, args.chunk_size, args.jelaskan)
+        for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
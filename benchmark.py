@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from cf_tables import CF_LEVELS
+from engine import DepressionExpertSystem, KnowledgeBase, combine_cf_parallel
+from generate_kb import generate_knowledge_base, generate_patients
+
+# Skala default: (jumlah gejala, jumlah aturan), dari ukuran rules.json
+# sampai basis pengetahuan sintetis terbesar
+DEFAULT_SCALES = [(23, 10), (100, 100), (1000, 1000), (1000, 10000), (10000, 100000)]
+
+
+def random_patient(system: DepressionExpertSystem, rng: random.Random) -> Dict:
+    """
+    Membuat satu pasien acak: gender dan fakta gejala dengan CF user
+    """
+    gejala_list = system.knowledge_base.get('gejala', [])
+    facts = {
+        gejala['kode']: rng.choice(CF_LEVELS)
+        for gejala in gejala_list
+        if rng.random() < 0.6
+    }
+    return {'gender': rng.choice(['pria', 'wanita']), 'facts': facts}
+
+
+def synthetic_knowledge_base(n_gejala: int, n_rules: int, seed: int = 0) -> Dict:
+    """
+    Basis pengetahuan sintetis untuk satu skala: 45% aturan pria, 45% aturan
+    wanita dan 10% aturan umum berantai (D* -> K* -> K*)
+    """
+    n_komplikasi = max(2, n_rules // 200)
+    n_layers = min(3, n_komplikasi)
+    n_general = max(n_layers, n_rules // 10)
+    n_gender = max(1, (n_rules - n_general) // 2)
+    return generate_knowledge_base(
+        n_gejala=n_gejala, n_penyakit=max(4, n_rules // 20), n_komplikasi=n_komplikasi,
+        n_pria=n_gender, n_wanita=n_gender, n_layers=n_layers,
+        rules_per_layer=n_general // n_layers, premis=(3, 9), fan_in=(2, 3), seed=seed)
+
+
+def measure(fn: Callable, repeat: int) -> Dict:
+    """
+    Menjalankan fn sebanyak repeat kali dan mengembalikan statistik latensi (mikrodetik)
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    total = sum(samples)
+    return {
+        'n': repeat,
+        'mean_us': round(total / repeat, 3),
+        'p50_us': round(samples[repeat // 2], 3),
+        'p95_us': round(samples[min(repeat - 1, int(repeat * 0.95))], 3),
+        'throughput_per_s': round(repeat / (total / 1e6), 1) if total else None,
+    }
+
+
+def peak_memory(fn: Callable) -> float:
+    """
+    Puncak alokasi memori Python (KiB) selama fn dijalankan
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_scale(n_gejala: int, n_rules: int, n_patients: int, seed: int) -> Dict:
+    """
+    Benchmark seluruh jalur inferensi untuk satu skala basis pengetahuan
+    """
+    data = synthetic_knowledge_base(n_gejala, n_rules, seed)
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as file:
+        json.dump(data, file)
+        path = file.name
+    try:
+        start = time.perf_counter()
+        kb = KnowledgeBase.load(path)
+        load_s = time.perf_counter() - start
+        load_peak = peak_memory(lambda: KnowledgeBase.load(path))
+    finally:
+        os.unlink(path)
+
+    rng = random.Random(seed)
+    system = DepressionExpertSystem(knowledge_base=kb)
+    patients = list(generate_patients(data, n_patients, seed))
+    result = {
+        'gejala': n_gejala,
+        'aturan': n_rules,
+        'pasien': n_patients,
+        'load_knowledge_base': {'detik': round(load_s, 4), 'peak_kib': load_peak},
+    }
+
+    # calculate_cf_rule dan combine_cf_parallel pada sampel aturan
+    network = kb.rule_networks['pria']
+    rules = [network.rules[i] for i in range(min(len(network.rules), 1000))]
+    system.facts = patients[0]['facts']
+    rule_iter = iter(rules * (1 + 5000 // max(1, len(rules))))
+    result['calculate_cf_rule'] = measure(lambda: system.calculate_cf_rule(next(rule_iter)), 5000)
+    pairs = [(rng.uniform(-1, 1), rng.uniform(-1, 1)) for _ in range(5000)]
+    pair_iter = iter(pairs)
+    result['combine_cf_parallel'] = measure(lambda: combine_cf_parallel(*next(pair_iter)), 5000)
+
+    # forward_chaining dan get_diagnosis_results per gender
+    for gender in ('pria', 'wanita'):
+        group = [p for p in patients if p['gender'] == gender] or patients
+        patient_iter = iter(group * 2)
+
+        def diagnose():
+            patient = next(patient_iter)
+            system.reset_system()
+            system.set_gender(gender)
+            system.facts = dict(patient['facts'])
+            system.forward_chaining()
+
+        result[f'forward_chaining_{gender}'] = measure(diagnose, len(group))
+        patient_iter = iter(group * 2)
+        result[f'forward_chaining_{gender}']['peak_kib'] = peak_memory(diagnose)
+
+    result['get_diagnosis_results'] = measure(system.get_diagnosis_results, 1000)
+    return result
+
+
+def bench_regression(rules_file: str, diagnoses: int, window: int, seed: int) -> Dict:
+    """
+    Menjalankan diagnosa berturut-turut pada satu instance sistem dan
+    mengukur latensi rata-rata per jendela. Latensi harus datar: inferensi
+    tidak boleh menumpuk aturan atau memori dari diagnosa sebelumnya.
+    """
+    rng = random.Random(seed)
+    system = DepressionExpertSystem(rules_file)
+    patients = [random_patient(system, rng) for _ in range(min(diagnoses, 1000))]
+    rule_counts_before = {g: len(n.rules) for g, n in system.rule_networks.items()}
+
+    windows: List[float] = []
+    start = time.perf_counter()
+    for i in range(diagnoses):
+        patient = patients[i % len(patients)]
+        system.reset_system()
+        system.set_gender(patient['gender'])
+        for kode, cf in patient['facts'].items():
+            system.add_fact(kode, cf)
+        system.forward_chaining()
+        system.get_diagnosis_results()
+        if (i + 1) % window == 0:
+            now = time.perf_counter()
+            windows.append((now - start) / window * 1e6)
+            start = now
+
+    rule_counts_after = {g: len(n.rules) for g, n in system.rule_networks.items()}
+    return {
+        'diagnosa': diagnoses,
+        'jendela': window,
+        'latensi_us_per_jendela': [round(w, 2) for w in windows],
+        'rasio_akhir_awal': round(windows[-1] / windows[0], 3) if windows else None,
+        'jumlah_aturan_stabil': rule_counts_before == rule_counts_after,
+    }
+
+
+def environment() -> Dict:
+    """
+    Informasi lingkungan untuk melacak hasil antar commit
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'waktu': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def parse_scales(text: str) -> List[Tuple[int, int]]:
+    """
+    Mengurai skala berformat 'gejala x aturan', dipisah koma (mis. 23x10,1000x1000)
+    """
+    scales = []
+    for part in text.split(','):
+        n_gejala, n_rules = part.lower().split('x')
+        scales.append((int(n_gejala), int(n_rules)))
+    return scales
+
+
+def main():
+    """
+    Fungsi utama untuk menjalankan benchmark
+    """
+    parser = argparse.ArgumentParser(description="Benchmark jalur inferensi engine.py")
+    parser.add_argument('--rules', default='rules.json', help="file basis pengetahuan untuk uji regresi")
+    parser.add_argument('--skala', type=parse_scales,
+                        default=DEFAULT_SCALES, help="daftar skala, mis. 23x10,1000x1000")
+    parser.add_argument('--pasien', type=int, default=200, help="jumlah pasien sintetis per skala")
+    parser.add_argument('--diagnosa', type=int, default=100000, help="jumlah diagnosa uji regresi")
+    parser.add_argument('--jendela', type=int, default=10000, help="ukuran jendela uji regresi")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', default=None, help="file JSON hasil, default stdout")
+    args = parser.parse_args()
+
+    report = {'lingkungan': environment(), 'skala': []}
+    for n_gejala, n_rules in args.skala:
+        # Jumlah pasien dikurangi untuk basis pengetahuan yang sangat besar
+        n_patients = min(args.pasien, max(10, 2000000 // max(1, n_rules * 10)))
+        report['skala'].append(bench_scale(n_gejala, n_rules, n_patients, args.seed))
+    report['regresi'] = bench_regression(args.rules, args.diagnosa, args.jendela, args.seed)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
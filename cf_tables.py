@@ -0,0 +1,224 @@
+import argparse
+import json
+import struct
+import time
+from array import array
+from itertools import product
+from typing import Dict, List, Tuple
+
+from engine import KnowledgeBase, combine_cf_parallel, infer, load_shared_knowledge_base
+
+# Nilai CF user dari 5 level radio button antarmuka
+# (Pasti Ada, Mungkin Ada, Tidak Tahu, Mungkin Tidak, Pasti Tidak)
+CF_LEVELS = (0.8, 0.4, 0.0, -0.4, -0.8)
+LEVEL_INDEX = {cf: i for i, cf in enumerate(CF_LEVELS)}
+
+# Aturan dengan premis lebih banyak dari ini tidak ditabelkan (5^10 entri)
+MAX_PREMISES = 10
+
+
+class CFTables:
+    """
+    Tabel lookup CF aturan untuk kuesioner 5 level. Setiap aturan yang
+    premisnya hanya gejala memiliki daftar nilai kecil berisi CF gejala x
+    cf_rule untuk setiap premis dan level (5k double), dan tabel indeks
+    uint8 ke daftar tersebut untuk setiap kombinasi level premisnya
+    (5^k entri). Indeks tabel dihitung dengan premis pertama sebagai digit
+    paling signifikan.
+    """
+    def __init__(self, version: str, tables: Dict[Tuple[str, int], array],
+                 values: Dict[Tuple[str, int], array]):
+        self.version = version
+        # (gender, indeks aturan) -> array indeks ('B') ke values
+        self.tables = tables
+        # (gender, indeks aturan) -> array CF kandidat ('d')
+        self.values = values
+
+    @property
+    def entries(self) -> int:
+        return sum(len(table) for table in self.tables.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(table) * table.itemsize for table in self.tables.values()) \
+            + sum(len(values) * values.itemsize for values in self.values.values())
+
+    def save(self, path: str):
+        """
+        Menyimpan tabel: satu baris header JSON lalu, per aturan, nilai
+        double mentah diikuti indeks uint8
+        """
+        header = {'versi': self.version, 'levels': CF_LEVELS, 'format': 2, 'tabel': []}
+        for (gender, idx), table in self.tables.items():
+            header['tabel'].append({'gender': gender, 'aturan': idx, 'panjang': len(table),
+                                    'nilai': len(self.values[(gender, idx)])})
+        with open(path, 'wb') as file:
+            file.write(json.dumps(header).encode('utf-8') + b'\n')
+            for key, table in self.tables.items():
+                self.values[key].tofile(file)
+                table.tofile(file)
+
+    @classmethod
+    def load(cls, path: str) -> 'CFTables':
+        """
+        Memuat tabel yang disimpan dengan save()
+        """
+        with open(path, 'rb') as file:
+            header = json.loads(file.readline().decode('utf-8'))
+            if header.get('format') != 2:
+                raise ValueError(f"Format tabel CF lama di {path}; kompilasi ulang dengan cf_tables.py")
+            tables = {}
+            values = {}
+            for item in header['tabel']:
+                key = (item['gender'], item['aturan'])
+                values[key] = array('d')
+                values[key].fromfile(file, item['nilai'])
+                tables[key] = array('B')
+                tables[key].fromfile(file, item['panjang'])
+        return cls(header['versi'], tables, values)
+
+
+def _level_values(kb: KnowledgeBase, premis: Tuple[str, ...]) -> List[List[float]]:
+    """
+    CF gejala (CF_pakar x CF_user) untuk setiap premis dan setiap level
+    """
+    return [[kb.calculate_cf_gejala(kode, {kode: cf}) for cf in CF_LEVELS] for kode in premis]
+
+
+def tabulable(kb: KnowledgeBase, network, idx: int) -> bool:
+    """
+    Aturan dapat ditabelkan jika semua premisnya gejala dan jumlahnya terbatas
+    """
+    premis = network.premises[idx]
+    return (0 < len(premis) <= MAX_PREMISES
+            and all(kode in kb.indexes['gejala'] for kode in premis))
+
+
+def build_table(kb: KnowledgeBase, rule, premis: Tuple[str, ...]) -> Tuple[array, array]:
+    """
+    Membangun tabel satu aturan. Nilai kandidat adalah CF gejala x cf_rule
+    untuk setiap premis dan level; tabel menyimpan, untuk setiap kombinasi
+    level, indeks premis yang menjadi min(CF gejala). Minimum dibangun
+    bertahap dengan urutan premis dan aturan seri yang sama seperti min()
+    pada calculate_cf_rule, sehingga nilai yang dirujuk identik sampai
+    level bit (termasuk tanda 0.0/-0.0).
+    """
+    n_levels = len(CF_LEVELS)
+    values = [v for level_values in _level_values(kb, premis) for v in level_values]
+    minima = list(range(n_levels))
+    for p in range(1, len(premis)):
+        level_indexes = range(p * n_levels, (p + 1) * n_levels)
+        minima = [i if values[i] < values[m] else m for m in minima for i in level_indexes]
+    cf_rule = rule.cf_rule
+    return array('B', minima), array('d', (v * cf_rule for v in values))
+
+
+def compile_tables(kb: KnowledgeBase) -> CFTables:
+    """
+    Mengompilasi tabel lookup untuk semua aturan gejala pada setiap gender
+    """
+    tables = {}
+    values = {}
+    for gender in ('pria', 'wanita'):
+        network = kb.rule_networks[gender]
+        for idx, rule in enumerate(network.rules):
+            if tabulable(kb, network, idx):
+                tables[(gender, idx)], values[(gender, idx)] = build_table(kb, rule, network.premises[idx])
+    return CFTables(kb.version, tables, values)
+
+
+def verify_tables(kb: KnowledgeBase, tables: CFTables) -> int:
+    """
+    Membandingkan setiap entri tabel dengan calculate_cf_rule secara bit demi bit.
+    Mengembalikan jumlah entri yang berbeda.
+    """
+    mismatches = 0
+    for (gender, idx), table in tables.tables.items():
+        network = kb.rule_networks[gender]
+        rule = network.rules[idx]
+        premis = network.premises[idx]
+        values = tables.values[(gender, idx)]
+        # product() menghasilkan kombinasi level dengan premis pertama
+        # sebagai digit paling signifikan, sama dengan urutan tabel
+        combinations = product(CF_LEVELS, repeat=len(premis))
+        for value_index, levels in zip(table, combinations):
+            expected = values[value_index]
+            actual = kb.calculate_cf_rule(rule, dict(zip(premis, levels)), {})
+            if struct.pack('<d', actual) != struct.pack('<d', expected):
+                mismatches += 1
+    return mismatches
+
+
+class TableDiagnoser:
+    """
+    Diagnosa berbasis tabel: CF aturan gejala diambil dari tabel, sisanya
+    (aturan turunan seperti R8/R9) dihitung seperti biasa. Fakta dengan CF
+    di luar 5 level kuesioner dialihkan ke infer().
+    """
+    def __init__(self, kb: KnowledgeBase, tables: CFTables):
+        if tables.version != kb.version:
+            raise ValueError("Tabel CF dibuat dari versi basis pengetahuan yang berbeda")
+        self.kb = kb
+        self.tables = tables
+
+    def diagnose(self, gender: str, facts: Dict) -> Dict:
+        """
+        Menghasilkan kesimpulan {kode: CF}, identik dengan infer()
+        """
+        network = self.kb.rule_networks.get(gender, self.kb.rule_networks[None])
+        if gender not in ('pria', 'wanita') or not network.acyclic \
+                or any(cf not in LEVEL_INDEX for cf in facts.values()):
+            return infer(self.kb, gender, facts)
+
+        n_levels = len(CF_LEVELS)
+        conclusions = {}
+        for idx in network.order:
+            premis = network.premises[idx]
+            if not premis or not all(kode in facts or kode in conclusions for kode in premis):
+                continue
+            table = self.tables.tables.get((gender, idx))
+            if table is not None:
+                offset = 0
+                for kode in premis:
+                    offset = offset * n_levels + LEVEL_INDEX[facts[kode]]
+                cf = self.tables.values[(gender, idx)][table[offset]]
+            else:
+                cf = self.kb.calculate_cf_rule(network.rules[idx], facts, conclusions)
+            if cf > 0:
+                kesimpulan = network.rules[idx].maka
+                if kesimpulan in conclusions:
+                    conclusions[kesimpulan] = combine_cf_parallel(conclusions[kesimpulan], cf)
+                else:
+                    conclusions[kesimpulan] = cf
+        return conclusions
+
+
+def main():
+    """
+    Mengompilasi tabel lookup CF dari basis pengetahuan
+    """
+    parser = argparse.ArgumentParser(description="Kompilasi tabel lookup CF kuesioner 5 level")
+    parser.add_argument('--rules', default='rules.json', help="file basis pengetahuan")
+    parser.add_argument('--output', '-o', default='rules.cftab', help="file tabel hasil")
+    parser.add_argument('--skip-verify', action='store_true', help="lewati verifikasi bit-exact")
+    args = parser.parse_args()
+
+    kb = load_shared_knowledge_base(args.rules)
+    start = time.perf_counter()
+    tables = compile_tables(kb)
+    build_time = time.perf_counter() - start
+    tables.save(args.output)
+
+    print(f"Tabel ditulis ke {args.output}")
+    print(f"- {len(tables.tables)} aturan ditabelkan")
+    print(f"- {tables.entries} entri ({tables.nbytes / 1024:.1f} KiB)")
+    print(f"- waktu kompilasi: {build_time:.3f} detik")
+    if not args.skip_verify:
+        start = time.perf_counter()
+        mismatches = verify_tables(kb, tables)
+        print(f"- verifikasi terhadap calculate_cf_rule: {mismatches} entri berbeda "
+              f"({time.perf_counter() - start:.3f} detik)")
+
+
+if __name__ == "__main__":
+    main()
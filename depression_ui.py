@@ -1,7 +1,218 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import json
-from engine import DepressionExpertSystem
+import queue
+import threading
+from engine import DepressionExpertSystem, DiagnosisCache, KnowledgeBaseWatcher
+
+# Tinggi satu baris daftar gejala (piksel); juga satuan scroll
+ROW_HEIGHT = 66
+# Pilihan level keyakinan gejala: (nilai radio button, teks, warna)
+CONFIDENCE_LEVELS = (
+    (1, "✅ Pasti Ada", '#27ae60'),
+    (2, "🟡 Mungkin Ada", '#f39c12'),
+    (3, "❓ Tidak Tahu", '#95a5a6'),
+    (4, "🟠 Mungkin Tidak", '#e67e22'),
+    (5, "❌ Pasti Tidak", '#e74c3c'),
+)
+
+# Interval (ms) pengecekan antrean hasil inferensi latar belakang
+RESULT_POLL_MS = 50
+# Indikator proses hanya ditampilkan jika inferensi berjalan lebih lama dari ini (ms)
+PROGRESS_DELAY_MS = 150
+
+
+class DiagnosisCancelled(Exception):
+    """
+    Inferensi latar belakang dihentikan karena dibatalkan pengguna
+    """
+
+
+class CancellableTrace:
+    """
+    Sink jejak yang tidak mencatat apa pun; setiap event inferensi
+    (beberapa kali per aturan) dipakai untuk memeriksa permintaan pembatalan
+    """
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def emit(self, event, **data):
+        if self.cancelled.is_set():
+            raise DiagnosisCancelled()
+
+
+class SymptomListModel:
+    """
+    Model daftar gejala yang terpisah dari widget: seluruh gejala, indeks
+    gejala yang lolos filter pencarian, level keyakinan per gejala dan
+    gejala yang dipilih (kode -> {'nama', 'cf'})
+    """
+    def __init__(self, gejala_list):
+        self.levels = {}
+        self.selected = {}
+        self.query = ''
+        self.set_items(gejala_list)
+
+    def set_items(self, gejala_list):
+        """
+        Mengganti daftar gejala (mis. setelah hot reload). Pilihan untuk
+        kode yang tidak ada lagi dihapus; kode tersebut dikembalikan.
+        """
+        self.items = [(g['kode'], g['nama'], g.get('cf_pakar', 0.0)) for g in gejala_list]
+        self._search = [f"{kode} {nama}".lower() for kode, nama, _ in self.items]
+        codes = {kode for kode, _, _ in self.items}
+        removed = [kode for kode in self.selected if kode not in codes]
+        for kode in removed:
+            del self.selected[kode]
+        self.filter(self.query)
+        return removed
+
+    def filter(self, text):
+        """
+        Menyaring gejala yang nama atau kodenya memuat teks (tanpa membedakan huruf besar)
+        """
+        self.query = text.strip().lower()
+        if self.query:
+            self.visible = [i for i, key in enumerate(self._search) if self.query in key]
+        else:
+            self.visible = list(range(len(self.items)))
+
+    def level(self, kode):
+        return self.levels.get(kode, 1)
+
+
+class SymptomRow:
+    """
+    Satu baris widget gejala yang dapat dipakai ulang untuk gejala mana pun
+    """
+    def __init__(self, view):
+        self.view = view
+        self.kode = None
+        self.nama = None
+        self.var = tk.BooleanVar()
+        self.conf_var = tk.IntVar(value=1)
+        self.frame = tk.Frame(view.canvas, bg='#ecf0f1', relief='groove', bd=1)
+        
+        checkbox = tk.Checkbutton(self.frame, variable=self.var, bg='#ecf0f1',
+                                  command=lambda: view.on_toggle(self.var, self.kode, self.nama))
+        checkbox.pack(side='left', padx=5)
+        
+        info_frame = tk.Frame(self.frame, bg='#ecf0f1')
+        info_frame.pack(side='left', fill='x', expand=True, padx=5, pady=2)
+        self.name_label = tk.Label(info_frame, font=('Arial', 9), bg='#ecf0f1', anchor='w')
+        self.name_label.pack(fill='x')
+        self.code_label = tk.Label(info_frame, font=('Arial', 8), fg='#7f8c8d', bg='#ecf0f1', anchor='w')
+        self.code_label.pack(fill='x')
+        
+        # Radio button 5 level keyakinan dalam satu baris
+        conf_frame = tk.Frame(info_frame, bg='#ecf0f1')
+        conf_frame.pack(fill='x')
+        for value, text, color in CONFIDENCE_LEVELS:
+            tk.Radiobutton(conf_frame, text=text, variable=self.conf_var, value=value,
+                           font=('Arial', 8), bg='#ecf0f1', fg=color,
+                           command=lambda v=value: view.on_level(self.kode, self.nama, v)).pack(side='left')
+        
+        self.window = view.canvas.create_window(0, 0, window=self.frame, anchor='nw',
+                                                height=ROW_HEIGHT - 2, state='hidden')
+
+    def bind(self, kode, nama, cf_pakar, selected, level):
+        """
+        Menampilkan satu gejala di baris ini; widget yang tidak berubah tidak dikonfigurasi ulang
+        """
+        if kode != self.kode:
+            self.kode = kode
+            self.nama = nama
+            self.name_label.config(text=nama)
+            self.code_label.config(text=f"{kode} (CF: {cf_pakar})")
+        if self.var.get() != selected:
+            self.var.set(selected)
+        if self.conf_var.get() != level:
+            self.conf_var.set(level)
+
+
+class VirtualSymptomList(tk.Frame):
+    """
+    Daftar gejala tervirtualisasi: widget hanya dibuat untuk baris yang
+    terlihat dan dipakai ulang saat di-scroll atau difilter, sehingga
+    jumlah widget bergantung pada tinggi jendela, bukan jumlah gejala.
+    Status pilihan dibaca dari SymptomListModel setiap kali baris digambar.
+    """
+    def __init__(self, parent, model, registry, on_toggle, on_level):
+        super().__init__(parent, bg='#ecf0f1')
+        self.model = model
+        # kode -> SymptomRow yang sedang menampilkan gejala tersebut
+        self.registry = registry
+        self.on_toggle = on_toggle
+        self.on_level = on_level
+        self.rows = []
+        self.canvas = tk.Canvas(self, bg='#ecf0f1', highlightthickness=0, yscrollincrement=ROW_HEIGHT)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.bind('<Configure>', self._on_resize)
+        # Scroll roda mouse hanya aktif saat kursor berada di atas daftar
+        self.canvas.bind('<Enter>', self._bind_wheel)
+        self.canvas.bind('<Leave>', self._unbind_wheel)
+        self.refresh()
+
+    def refresh(self, scroll_to_top=False):
+        """
+        Memperbarui tinggi area scroll sesuai jumlah gejala yang terlihat lalu menggambar ulang
+        """
+        height = len(self.model.visible) * ROW_HEIGHT
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), height))
+        if scroll_to_top:
+            self.canvas.yview_moveto(0)
+        self.render()
+
+    def render(self):
+        """
+        Mengikat baris widget ke gejala yang berada di area terlihat
+        """
+        first = max(0, int(self.canvas.canvasy(0)) // ROW_HEIGHT)
+        visible = self.model.visible
+        items = self.model.items
+        selected = self.model.selected
+        self.registry.clear()
+        for offset, row in enumerate(self.rows):
+            position = first + offset
+            if position < len(visible):
+                kode, nama, cf_pakar = items[visible[position]]
+                row.bind(kode, nama, cf_pakar, kode in selected, self.model.level(kode))
+                self.canvas.coords(row.window, 0, position * ROW_HEIGHT)
+                self.canvas.itemconfigure(row.window, state='normal')
+                self.registry[kode] = row
+            else:
+                self.canvas.itemconfigure(row.window, state='hidden')
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def _on_resize(self, event):
+        # Satu baris cadangan untuk baris yang terpotong di tepi bawah
+        needed = event.height // ROW_HEIGHT + 2
+        while len(self.rows) < needed:
+            self.rows.append(SymptomRow(self))
+        for row in self.rows:
+            self.canvas.itemconfigure(row.window, width=event.width)
+        self.refresh()
+
+    def _bind_wheel(self, event):
+        self.canvas.bind_all('<MouseWheel>', self._on_wheel)
+        self.canvas.bind_all('<Button-4>', self._on_wheel)
+        self.canvas.bind_all('<Button-5>', self._on_wheel)
+
+    def _unbind_wheel(self, event):
+        self.canvas.unbind_all('<MouseWheel>')
+        self.canvas.unbind_all('<Button-4>')
+        self.canvas.unbind_all('<Button-5>')
+
+    def _on_wheel(self, event):
+        step = -1 if event.num == 4 or event.delta > 0 else 1
+        self.canvas.yview_scroll(step, 'units')
+
 
 class DepressionDiagnosisUI:
     def __init__(self, root):
@@ -10,15 +221,26 @@ class DepressionDiagnosisUI:
         self.root.geometry("1000x700")
         self.root.configure(bg='#f0f0f0')
         
-        # Inisialisasi sistem pakar
-        self.system = DepressionExpertSystem()
+        # Inisialisasi sistem pakar dengan cache hasil diagnosa
+        self.system = DepressionExpertSystem(cache=DiagnosisCache())
+        # Perubahan rules.json dimuat ulang di latar belakang tanpa restart
+        self.watcher = KnowledgeBaseWatcher(self.system.rules_file).start()
         
         # Variabel untuk menyimpan gejala yang dipilih
         self.selected_symptoms = {}
+        # Registri kode gejala -> baris widget (diisi oleh load_symptoms)
+        self.symptom_rows = {}
         self.gender = None
+        # Setelah diagnosa pertama, hasil diperbarui langsung saat pilihan berubah
+        self.live_results = False
+        # Diagnosa latar belakang: sesi yang sedang dihitung dan antrean hasilnya
+        self.diagnosis_job = None
+        self.diagnosis_queue = queue.Queue()
+        self._polling_results = False
         
         # Setup UI
         self.setup_ui()
+        self.root.after(1000, self.poll_knowledge_base)
         
     def setup_ui(self):
         """
@@ -96,24 +318,17 @@ class DepressionDiagnosisUI:
                                font=('Arial', 12, 'bold'), bg='#ecf0f1')
         gejala_label.pack(pady=10)
         
-        # Scrollable frame for symptoms
-        canvas = tk.Canvas(left_frame, bg='#ecf0f1')
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg='#ecf0f1')
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        # Pencarian gejala berdasarkan nama atau kode
+        search_frame = tk.Frame(left_frame, bg='#ecf0f1')
+        search_frame.pack(fill='x', padx=10, pady=(0, 5))
+        tk.Label(search_frame, text="🔍 Cari:", font=('Arial', 9), bg='#ecf0f1').pack(side='left')
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self.filter_symptoms())
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=('Arial', 9))
+        search_entry.pack(side='left', fill='x', expand=True, padx=5)
         
         # Load symptoms
-        self.load_symptoms(scrollable_frame)
-        
-        canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-        scrollbar.pack(side="right", fill="y")
+        self.load_symptoms(left_frame)
         
         # Right panel - Results and controls
         right_frame = tk.Frame(main_frame, bg='#ecf0f1', relief='raised', bd=2)
@@ -158,6 +373,14 @@ class DepressionDiagnosisUI:
                             font=('Arial', 10, 'bold'), padx=20, pady=5)
         clear_btn.pack(side='left', padx=5)
         
+        # Indikator diagnosa yang sedang berjalan (disembunyikan saat idle)
+        self.progress_frame = tk.Frame(button_frame, bg='#ecf0f1')
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode='indeterminate', length=100)
+        self.progress_bar.pack(side='left', padx=5)
+        cancel_btn = tk.Button(self.progress_frame, text="BATAL", command=self.cancel_diagnosis,
+                               bg='#95a5a6', fg='white', font=('Arial', 9, 'bold'), padx=10)
+        cancel_btn.pack(side='left', padx=5)
+        
         # Results area
         results_label = tk.Label(right_frame, text="HASIL DIAGNOSA", 
                                 font=('Arial', 12, 'bold'), bg='#ecf0f1')
@@ -169,89 +392,30 @@ class DepressionDiagnosisUI:
         
     def load_symptoms(self, parent):
         """
-        Load gejala dari knowledge base ke UI
-        """
-        gejala_list = self.system.knowledge_base.get('gejala', [])
-        
-        for i, gejala in enumerate(gejala_list):
-            # Frame for each symptom
-            symptom_frame = tk.Frame(parent, bg='#ecf0f1', relief='groove', bd=1)
-            symptom_frame.pack(fill='x', padx=5, pady=2)
-            
-            # Checkbox for symptom selection
-            var = tk.BooleanVar()
-            checkbox = tk.Checkbutton(symptom_frame, variable=var, 
-                                    command=lambda v=var, k=gejala['kode'], n=gejala['nama']: 
-                                    self.toggle_symptom(v, k, n),
-                                    bg='#ecf0f1')
-            checkbox.pack(side='left', padx=5, pady=5)
-            
-            # Symptom info
-            info_frame = tk.Frame(symptom_frame, bg='#ecf0f1')
-            info_frame.pack(side='left', fill='x', expand=True, padx=5, pady=5)
-            
-            # Symptom name
-            name_label = tk.Label(info_frame, text=gejala['nama'], 
-                                 font=('Arial', 9), bg='#ecf0f1', anchor='w')
-            name_label.pack(fill='x')
-            
-            # Symptom code and CF
-            code_label = tk.Label(info_frame, text=f"{gejala['kode']} (CF: {gejala['cf_pakar']})", 
-                                 font=('Arial', 8), fg='#7f8c8d', bg='#ecf0f1', anchor='w')
-            code_label.pack(fill='x')
-            
-            # Confidence level input with radio buttons (1-5 levels)
-            conf_frame = tk.Frame(symptom_frame, bg='#ecf0f1', relief='groove', bd=2)
-            conf_frame.pack(side='right', padx=8, pady=8)
-            
-            # Title
-            conf_title = tk.Label(conf_frame, text="Tingkat Keyakinan:", 
-                                 font=('Arial', 8, 'bold'), bg='#ecf0f1', fg='#2c3e50')
-            conf_title.pack(pady=(5, 3))
-            
-            # Radio buttons for 5 levels
-            conf_var = tk.IntVar(value=1)  # Default to level 1 (Pasti Ada)
-            
-            # Level 1: Pasti Ada (0.6-1.0)
-            level1 = tk.Radiobutton(conf_frame, text="✅ Pasti Ada", 
-                                  variable=conf_var, value=1, 
-                                  font=('Arial', 8), bg='#ecf0f1', fg='#27ae60',
-                                  command=lambda: self.update_cf_from_radio(gejala['kode'], gejala['nama'], 1))
-            level1.pack(anchor='w', pady=1)
-            
-            # Level 2: Mungkin Ada (0.2-0.6)
-            level2 = tk.Radiobutton(conf_frame, text="🟡 Mungkin Ada", 
-                                  variable=conf_var, value=2, 
-                                  font=('Arial', 8), bg='#ecf0f1', fg='#f39c12',
-                                  command=lambda: self.update_cf_from_radio(gejala['kode'], gejala['nama'], 2))
-            level2.pack(anchor='w', pady=1)
-            
-            # Level 3: Tidak Tahu (-0.2-0.2)
-            level3 = tk.Radiobutton(conf_frame, text="❓ Tidak Tahu", 
-                                  variable=conf_var, value=3, 
-                                  font=('Arial', 8), bg='#ecf0f1', fg='#95a5a6',
-                                  command=lambda: self.update_cf_from_radio(gejala['kode'], gejala['nama'], 3))
-            level3.pack(anchor='w', pady=1)
-            
-            # Level 4: Mungkin Tidak (-0.6--0.2)
-            level4 = tk.Radiobutton(conf_frame, text="🟠 Mungkin Tidak", 
-                                  variable=conf_var, value=4, 
-                                  font=('Arial', 8), bg='#ecf0f1', fg='#e67e22',
-                                  command=lambda: self.update_cf_from_radio(gejala['kode'], gejala['nama'], 4))
-            level4.pack(anchor='w', pady=1)
-            
-            # Level 5: Pasti Tidak (-1.0--0.6)
-            level5 = tk.Radiobutton(conf_frame, text="❌ Pasti Tidak", 
-                                  variable=conf_var, value=5, 
-                                  font=('Arial', 8), bg='#ecf0f1', fg='#e74c3c',
-                                  command=lambda: self.update_cf_from_radio(gejala['kode'], gejala['nama'], 5))
-            level5.pack(anchor='w', pady=1)
-            
-            # Store references
-            symptom_frame.var = var
-            symptom_frame.conf_var = conf_var
-            symptom_frame.kode = gejala['kode']
-            symptom_frame.nama = gejala['nama']
+        Load gejala dari knowledge base ke model daftar gejala dan membuat
+        daftar tervirtualisasi. Baris yang sedang terlihat terdaftar di
+        self.symptom_rows sehingga dapat dicari langsung per kode.
+        """
+        self.symptom_model = SymptomListModel(self.system.knowledge_base.get('gejala', []))
+        # Pilihan gejala disimpan di model, bukan di widget
+        self.selected_symptoms = self.symptom_model.selected
+        self.symptom_list = VirtualSymptomList(parent, self.symptom_model, self.symptom_rows,
+                                               self.toggle_symptom, self.set_symptom_level)
+        self.symptom_list.pack(fill='both', expand=True, padx=5, pady=5)
+    
+    def filter_symptoms(self):
+        """
+        Menyaring daftar gejala sesuai teks pencarian
+        """
+        self.symptom_model.filter(self.search_var.get())
+        self.symptom_list.refresh(scroll_to_top=True)
+    
+    def set_symptom_level(self, kode, nama, level):
+        """
+        Menyimpan level keyakinan (radio button) gejala di model
+        """
+        self.symptom_model.levels[kode] = level
+        self.update_cf_from_radio(kode, nama, level)
     
     def update_cf_from_radio(self, kode, nama, level):
         """
@@ -280,6 +444,10 @@ class DepressionDiagnosisUI:
         self.gender = self.gender_var.get()
         self.system.set_gender(self.gender)
         print(f"Gender dipilih: {self.gender}")
+        # Diagnosa yang sedang berjalan (termasuk yang pertama) memakai
+        # gender lama, sehingga selalu diulang
+        if self.live_results or self.diagnosis_job is not None:
+            self.start_diagnosis()
     
     def update_cf_indicator_and_symptom(self, value, kode, nama):
         """
@@ -318,57 +486,40 @@ class DepressionDiagnosisUI:
             color = "#e74c3c"  # Red
         
         # Update indicator label
-        for widget in self.root.winfo_children():
-            self._update_cf_indicator_recursive(widget, kode, text, color)
-    
-    def _update_cf_indicator_recursive(self, widget, kode, text, color):
-        """
-        Helper function to update CF indicator recursively
-        """
-        if hasattr(widget, 'kode') and widget.kode == kode and hasattr(widget, 'cf_indicator'):
-            widget.cf_indicator.config(text=text, fg=color)
-        
-        for child in widget.winfo_children():
-            self._update_cf_indicator_recursive(child, kode, text, color)
+        row = self.symptom_rows.get(kode)
+        if row is not None and hasattr(row, 'cf_indicator'):
+            row.cf_indicator.config(text=text, fg=color)
     
     def toggle_symptom(self, var, kode, nama):
         """
         Toggle gejala selection
         """
         if var.get():
-            # Find the parent frame that contains this var
-            parent = None
-            for widget in self.root.winfo_children():
-                parent = self._find_parent_with_var(widget, var)
-                if parent:
-                    break
-            
-            if parent and hasattr(parent, 'conf_var'):
-                # Get the selected radio button level
-                level = parent.conf_var.get()
-                # Convert level to CF value - maksimal 0.8
-                if level == 1:  # Pasti Ada
-                    conf_value = 0.8  # Maksimal CF yang bisa dipilih
-                elif level == 2:  # Mungkin Ada
-                    conf_value = 0.4
-                elif level == 3:  # Tidak Tahu
-                    conf_value = 0.0
-                elif level == 4:  # Mungkin Tidak
-                    conf_value = -0.4
-                else:  # Pasti Tidak
-                    conf_value = -0.8
-            else:
-                conf_value = 0.8  # Default to Pasti Ada (maksimal)
+            # Level radio button diambil dari model (default Pasti Ada)
+            level = self.symptom_model.level(kode)
+            # Convert level to CF value - maksimal 0.8
+            if level == 1:  # Pasti Ada
+                conf_value = 0.8  # Maksimal CF yang bisa dipilih
+            elif level == 2:  # Mungkin Ada
+                conf_value = 0.4
+            elif level == 3:  # Tidak Tahu
+                conf_value = 0.0
+            elif level == 4:  # Mungkin Tidak
+                conf_value = -0.4
+            else:  # Pasti Tidak
+                conf_value = -0.8
                 
             self.selected_symptoms[kode] = {
                 'nama': nama,
                 'cf': conf_value
             }
             self.update_selected_list()
+            self.refresh_live_results(kode)
         else:
             if kode in self.selected_symptoms:
                 del self.selected_symptoms[kode]
                 self.update_selected_list()
+                self.refresh_live_results(kode)
     
     def update_symptom_cf(self, kode, cf_value):
         """
@@ -377,20 +528,38 @@ class DepressionDiagnosisUI:
         if kode in self.selected_symptoms:
             self.selected_symptoms[kode]['cf'] = cf_value
             self.update_selected_list()
+            self.refresh_live_results(kode)
+
+    def refresh_live_results(self, kode):
+        """
+        Memperbarui hasil diagnosa secara inkremental untuk satu gejala
+        yang berubah (hanya setelah diagnosa pertama dijalankan)
+        """
+        if self.diagnosis_job is not None:
+            # Diagnosa penuh (termasuk yang pertama) sedang berjalan dengan
+            # pilihan lama: ulangi
+            self.start_diagnosis()
+            return
+        if not self.live_results:
+            return
+        if kode in self.selected_symptoms:
+            self.system.update_fact(kode, self.selected_symptoms[kode]['cf'])
+        else:
+            self.system.retract_fact(kode)
+        self.show_results()
     
-    def _find_parent_with_var(self, widget, target_var):
+    def poll_knowledge_base(self):
         """
-        Helper function to find parent widget that contains the target var
+        Memakai basis pengetahuan baru hasil hot reload (dicek berkala di
+        thread Tk) dan menghitung ulang hasil yang sedang ditampilkan
         """
-        if hasattr(widget, 'var') and widget.var == target_var:
-            return widget
-        
-        for child in widget.winfo_children():
-            result = self._find_parent_with_var(child, target_var)
-            if result:
-                return result
-        
-        return None
+        if self.system.set_knowledge_base(self.watcher.current):
+            self.symptom_model.set_items(self.system.knowledge_base.get('gejala', []))
+            self.update_selected_list()
+            self.symptom_list.refresh()
+            if self.live_results or self.diagnosis_job is not None:
+                self.start_diagnosis()
+        self.root.after(1000, self.poll_knowledge_base)
     
     def update_selected_list(self):
         """
@@ -412,117 +581,190 @@ class DepressionDiagnosisUI:
             messagebox.showwarning("Peringatan", "Pilih gender pasien terlebih dahulu!")
             return
         
-        # Clear previous results
-        self.results_text.delete(1.0, tk.END)
-        
-        # Reset system
-        self.system.reset_system()
-        
-        # Set gender
-        self.system.set_gender(self.gender)
-        
-        # Add selected symptoms to system
+        self.start_diagnosis()
+    
+    def start_diagnosis(self):
+        """
+        Menjalankan forward chaining di thread latar belakang pada sesi baru
+        (gender dan gejala yang dipilih saat ini). Hasilnya dikirim lewat
+        antrean dan diambil oleh poll_diagnosis di thread Tk. Diagnosa yang
+        masih berjalan dibatalkan.
+        """
+        self.cancel_diagnosis()
+        trace = CancellableTrace()
+        session = DepressionExpertSystem(self.system.rules_file, knowledge_base=self.system.kb,
+                                         cache=self.system.cache)
+        session.set_gender(self.gender)
         for kode, info in self.selected_symptoms.items():
-            self.system.add_fact(kode, info['cf'])
+            session.add_fact(kode, info['cf'])
+        session.trace = trace
+        self.diagnosis_job = session
+        
+        def work():
+            try:
+                session.forward_chaining()
+                session.get_diagnosis_results()
+                self.diagnosis_queue.put((session, None))
+            except DiagnosisCancelled:
+                pass
+            except Exception as exc:
+                self.diagnosis_queue.put((session, exc))
+        
+        threading.Thread(target=work, daemon=True).start()
+        self.root.after(PROGRESS_DELAY_MS, lambda: self._show_progress(session))
+        if not self._polling_results:
+            self._polling_results = True
+            self.root.after(RESULT_POLL_MS, self.poll_diagnosis)
+    
+    def poll_diagnosis(self):
+        """
+        Mengambil hasil inferensi latar belakang dari antrean (thread Tk).
+        Hasil dari diagnosa yang sudah dibatalkan atau diganti diabaikan.
+        """
+        try:
+            while True:
+                session, error = self.diagnosis_queue.get_nowait()
+                if session is not self.diagnosis_job:
+                    continue
+                self.diagnosis_job = None
+                self._hide_progress()
+                if error is not None:
+                    messagebox.showerror("Error", f"Diagnosa gagal: {error}")
+                    continue
+                session.trace = None
+                # Sesi baru dipakai untuk pembaruan inkremental berikutnya
+                self.system = session
+                self.live_results = True
+                self.show_results()
+        except queue.Empty:
+            pass
+        if self.diagnosis_job is not None:
+            self.root.after(RESULT_POLL_MS, self.poll_diagnosis)
+        else:
+            self._polling_results = False
+    
+    def cancel_diagnosis(self):
+        """
+        Membatalkan diagnosa latar belakang yang sedang berjalan
+        """
+        if self.diagnosis_job is None:
+            return
+        self.diagnosis_job.trace.cancelled.set()
+        self.diagnosis_job = None
+        self._hide_progress()
+    
+    def _show_progress(self, session):
+        if self.diagnosis_job is session:
+            self.progress_frame.pack(side='left', padx=5)
+            self.progress_bar.start(10)
+    
+    def _hide_progress(self):
+        self.progress_bar.stop()
+        self.progress_frame.pack_forget()
+    
+    def show_results(self):
+        """
+        Menampilkan hasil diagnosa terakhir dari sistem pakar. Teks disusun
+        lebih dulu lalu ditulis ke widget dalam satu pembaruan.
+        """
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, self.format_results())
+        # Scroll to top
+        self.results_text.see(1.0)
+    
+    def format_results(self):
+        """
+        Menyusun teks hasil diagnosa terakhir
+        """
+        lines = []
+        write = lines.append
         
-        # Run forward chaining
-        self.results_text.insert(tk.END, "=== PROSES DIAGNOSA ===\n\n")
-        self.results_text.insert(tk.END, f"Gender: {self.gender.upper()}\n")
-        self.results_text.insert(tk.END, f"Gejala yang dimasukkan: {len(self.selected_symptoms)}\n")
+        write("=== PROSES DIAGNOSA ===\n\n")
+        write(f"Gender: {self.gender.upper()}\n")
+        write(f"Gejala yang dimasukkan: {len(self.selected_symptoms)}\n")
         for kode, info in self.selected_symptoms.items():
-            self.results_text.insert(tk.END, f"- {kode}: {info['nama']} (CF: {info['cf']})\n")
+            write(f"- {kode}: {info['nama']} (CF: {info['cf']})\n")
         
-        self.results_text.insert(tk.END, "\n" + "="*50 + "\n")
-        self.results_text.insert(tk.END, "HASIL DIAGNOSA DEPRESI\n")
-        self.results_text.insert(tk.END, "="*50 + "\n\n")
+        write("\n" + "="*50 + "\n")
+        write("HASIL DIAGNOSA DEPRESI\n")
+        write("="*50 + "\n\n")
         
-        # Run inference
-        conclusions = self.system.forward_chaining()
+        conclusions = self.system.conclusions
         
         if not conclusions:
-            self.results_text.insert(tk.END, "Tidak ada kesimpulan yang dapat diambil.\n")
-            self.results_text.insert(tk.END, "Pastikan gejala yang dimasukkan sesuai dengan aturan yang ada.\n")
-            return
+            write("Tidak ada kesimpulan yang dapat diambil.\n")
+            write("Pastikan gejala yang dimasukkan sesuai dengan aturan yang ada.\n")
+            return ''.join(lines)
         
         # Get diagnosis results
         results = self.system.get_diagnosis_results()
         
         # Display main diagnosis
-        self.results_text.insert(tk.END, "DIAGNOSA UTAMA:\n")
-        self.results_text.insert(tk.END, "-" * 30 + "\n")
+        write("DIAGNOSA UTAMA:\n")
+        write("-" * 30 + "\n")
         
         penyakit_count = 0
         for i, (kode, nama, cf) in enumerate(results, 1):
             if kode.startswith('D'):
                 penyakit_count += 1
                 confidence = "Sangat Tinggi" if cf >= 0.8 else "Tinggi" if cf >= 0.6 else "Sedang" if cf >= 0.4 else "Rendah"
-                self.results_text.insert(tk.END, f"{i}. {nama}\n")
-                self.results_text.insert(tk.END, f"   Kode: {kode}\n")
-                self.results_text.insert(tk.END, f"   Tingkat Keyakinan: {cf:.3f} ({confidence})\n\n")
+                write(f"{i}. {nama}\n")
+                write(f"   Kode: {kode}\n")
+                write(f"   Tingkat Keyakinan: {cf:.3f} ({confidence})\n\n")
         
         if penyakit_count == 0:
-            self.results_text.insert(tk.END, "Tidak ada diagnosa penyakit yang dapat ditegakkan.\n\n")
+            write("Tidak ada diagnosa penyakit yang dapat ditegakkan.\n\n")
         
         # Display complications
-        self.results_text.insert(tk.END, "KOMPLIKASI YANG MUNGKIN:\n")
-        self.results_text.insert(tk.END, "-" * 30 + "\n")
+        write("KOMPLIKASI YANG MUNGKIN:\n")
+        write("-" * 30 + "\n")
         
         komplikasi_found = False
         for kode, nama, cf in results:
             if kode.startswith('K'):
                 komplikasi_found = True
                 confidence = "Sangat Tinggi" if cf >= 0.8 else "Tinggi" if cf >= 0.6 else "Sedang" if cf >= 0.4 else "Rendah"
-                self.results_text.insert(tk.END, f"- {nama}\n")
-                self.results_text.insert(tk.END, f"  Kode: {kode}\n")
-                self.results_text.insert(tk.END, f"  Tingkat Keyakinan: {cf:.3f} ({confidence})\n\n")
+                write(f"- {nama}\n")
+                write(f"  Kode: {kode}\n")
+                write(f"  Tingkat Keyakinan: {cf:.3f} ({confidence})\n\n")
         
         if not komplikasi_found:
-            self.results_text.insert(tk.END, "Tidak ada komplikasi yang teridentifikasi.\n\n")
+            write("Tidak ada komplikasi yang teridentifikasi.\n\n")
         
         # Display recommendations
-        self.results_text.insert(tk.END, "REKOMENDASI:\n")
-        self.results_text.insert(tk.END, "-" * 30 + "\n")
+        write("REKOMENDASI:\n")
+        write("-" * 30 + "\n")
         
         if results:
             highest_cf = results[0][2]
             if highest_cf >= 0.8:
-                self.results_text.insert(tk.END, "• Segera konsultasi dengan psikolog atau psikiater\n")
-                self.results_text.insert(tk.END, "• Pertimbangkan terapi medis dan psikologis\n")
-                self.results_text.insert(tk.END, "• Pantau kondisi secara berkala\n")
+                write("• Segera konsultasi dengan psikolog atau psikiater\n")
+                write("• Pertimbangkan terapi medis dan psikologis\n")
+                write("• Pantau kondisi secara berkala\n")
             elif highest_cf >= 0.6:
-                self.results_text.insert(tk.END, "• Konsultasi dengan tenaga kesehatan mental\n")
-                self.results_text.insert(tk.END, "• Pertimbangkan konseling atau terapi\n")
-                self.results_text.insert(tk.END, "• Lakukan aktivitas yang menenangkan\n")
+                write("• Konsultasi dengan tenaga kesehatan mental\n")
+                write("• Pertimbangkan konseling atau terapi\n")
+                write("• Lakukan aktivitas yang menenangkan\n")
             else:
-                self.results_text.insert(tk.END, "• Konsultasi dengan dokter umum terlebih dahulu\n")
-                self.results_text.insert(tk.END, "• Pantau gejala secara berkala\n")
-                self.results_text.insert(tk.END, "• Jaga pola hidup sehat\n")
+                write("• Konsultasi dengan dokter umum terlebih dahulu\n")
+                write("• Pantau gejala secara berkala\n")
+                write("• Jaga pola hidup sehat\n")
         
-        # Scroll to top
-        self.results_text.see(1.0)
+        return ''.join(lines)
     
     def clear_selection(self):
         """
         Clear semua pilihan gejala
         """
+        self.cancel_diagnosis()
         self.selected_symptoms.clear()
+        # Hanya baris yang terlihat yang perlu digambar ulang
+        self.symptom_list.render()
         self.gender = None
+        self.live_results = False
         self.gender_var.set("")
         self.update_selected_list()
         self.results_text.delete(1.0, tk.END)
-        
-        # Uncheck all checkboxes
-        for widget in self.root.winfo_children():
-            self._uncheck_widgets(widget)
-    
-    def _uncheck_widgets(self, widget):
-        """
-        Helper function to uncheck all checkboxes recursively
-        """
-        if hasattr(widget, 'var'):
-            widget.var.set(False)
-        for child in widget.winfo_children():
-            self._uncheck_widgets(child)
 
 def main():
     """
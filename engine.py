@@ -1,81 +1,638 @@
+import bisect
+import hashlib
+import heapq
+import itertools
 import json
 import math
-from typing import Dict, List, Tuple, Set
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, List, Optional, Sequence, Tuple, Set
 
-class DepressionExpertSystem:
-    def __init__(self, rules_file: str = "rules.json"):
+
+class Rule:
+    """
+    Aturan terkompilasi yang hanya dibaca. Atribut disimpan dengan
+    __slots__ (tanpa __dict__ per objek) dan premis juga tersedia sebagai
+    tuple ID simbol untuk inferensi. get(), [] dan to_dict() menjaga
+    kompatibilitas dengan bentuk dict pada rules.json.
+    """
+    __slots__ = ('id', 'jika', 'maka', 'cf_rule', 'premis', 'premis_id', 'maka_id')
+    FIELDS = ('id', 'jika', 'maka', 'cf_rule')
+
+    def __init__(self, data: Dict, symbol_ids: Dict[str, int]):
+        self.id = data.get('id', '')
+        self.jika = tuple(data.get('jika', []))
+        self.maka = data.get('maka', '')
+        self.cf_rule = data.get('cf_rule', 0.0)
+        # Premis unik, urutan dipertahankan
+        self.premis = tuple(dict.fromkeys(self.jika))
+        self.premis_id = tuple(symbol_ids[kode] for kode in self.premis)
+        self.maka_id = symbol_ids[self.maka]
+
+    @classmethod
+    def from_fields(cls, rule_id: str, jika: Tuple[str, ...], maka: str, cf_rule: float,
+                    premis_id: Tuple[int, ...], maka_id: int) -> 'Rule':
+        """
+        Membuat aturan dari field yang sudah terkompilasi (artefak biner
+        kb_compiler.py), tanpa dict rules.json dan tabel simbol
+        """
+        rule = cls.__new__(cls)
+        rule.id = rule_id
+        rule.jika = jika
+        rule.maka = maka
+        rule.cf_rule = cf_rule
+        rule.premis = tuple(dict.fromkeys(jika))
+        rule.premis_id = premis_id
+        rule.maka_id = maka_id
+        return rule
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict:
+        """
+        Bentuk JSON aturan, sama seperti pada rules.json
+        """
+        return {'id': self.id, 'jika': list(self.jika), 'maka': self.maka, 'cf_rule': self.cf_rule}
+
+    def __repr__(self):
+        return f"Rule({self.to_dict()!r})"
+
+
+class RuleNetwork:
+    """
+    Jaringan aturan terkompilasi (gaya Rete) untuk satu himpunan aturan.
+    Aturan diindeks berdasarkan kode premis (G*, D*) sehingga penambahan
+    fakta atau kesimpulan hanya mengaktifkan aturan yang bergantung padanya.
+    """
+    def __init__(self, rules: Sequence[Rule], n_symbols: int):
+        """
+        `rules` adalah objek Rule dari KnowledgeBase (dipakai bersama antar
+        jaringan). Jaringan dari artefak biner dibangun oleh
+        kb_compiler.MappedRuleNetwork tanpa melewati konstruktor ini.
+        """
+        self.rules = tuple(rules)
+        self.premises = tuple(rule.premis for rule in self.rules)
+        # Indeks: ID simbol premis -> indeks aturan yang memakainya
+        index: Dict[str, List[int]] = {}
+        symbol_of: Dict[str, int] = {}
+        for i, rule in enumerate(self.rules):
+            for kode, sym in zip(rule.premis, rule.premis_id):
+                index.setdefault(kode, []).append(i)
+                symbol_of[kode] = sym
+        self.index = MappingProxyType({kode: tuple(ids) for kode, ids in index.items()})
+        index_ids: List[Tuple[int, ...]] = [()] * n_symbols
+        for kode, ids in self.index.items():
+            index_ids[symbol_of[kode]] = ids
+        self.index_ids = tuple(index_ids)
+        # Indeks: kode kesimpulan -> daftar indeks aturan yang menghasilkannya
+        producers: Dict[str, List[int]] = {}
+        for i, rule in enumerate(self.rules):
+            producers.setdefault(rule.maka, []).append(i)
+        self.producers = MappingProxyType({kode: tuple(ids) for kode, ids in producers.items()})
+        # Urutan topologis: aturan turunan dijadwalkan setelah semua
+        # aturan yang menghasilkan premisnya
+        levels = self._compute_levels()
+        self.order = tuple(sorted(range(len(self.rules)), key=lambda i: (levels[i], i)))
+        # Jaringan asiklik dapat dievaluasi dalam satu sapuan sesuai urutan
+        self.acyclic = all(
+            levels[j] < levels[i]
+            for i, premis in enumerate(self.premises)
+            for kode in premis
+            for j in self.producers.get(kode, ())
+        )
+        rank = [0] * len(self.rules)
+        for posisi, i in enumerate(self.order):
+            rank[i] = posisi
+        self.rank = tuple(rank)
+        # Nilai awal per diagnosa, disalin sekali alih-alih dihitung ulang:
+        # jumlah premis per aturan dan rank aturan tanpa premis (heap terurut)
+        self.premise_counts = tuple(len(premis) for premis in self.premises)
+        self.roots = tuple(sorted(rank[i] for i, premis in enumerate(self.premises) if not premis))
+        self._strata = None
+
+    def _compute_levels(self) -> List[int]:
+        """
+        Menghitung tingkat (kedalaman dependensi) setiap aturan.
+        Aturan yang hanya memakai gejala berada di tingkat 0.
+        Siklus diputus dengan mengabaikan sisi balik. Penelusuran DFS
+        memakai stack eksplisit sehingga rantai aturan yang sangat panjang
+        tidak terbentur batas rekursi Python.
+        """
+        levels: List[int] = [-1] * len(self.rules)
+        visiting = bytearray(len(self.rules))
+        producers = self.producers
+
+        def dependencies(i: int):
+            for kode in self.premises[i]:
+                yield from producers.get(kode, ())
+
+        for root in range(len(self.rules)):
+            if levels[root] >= 0:
+                continue
+            visiting[root] = 1
+            # Setiap frame: (aturan, iterator dependensi), tingkat sementaranya di `pending`
+            stack = [(root, dependencies(root))]
+            pending = [0]
+            while stack:
+                i, deps = stack[-1]
+                for j in deps:
+                    if levels[j] >= 0:
+                        pending[-1] = max(pending[-1], levels[j] + 1)
+                    elif not visiting[j]:
+                        visiting[j] = 1
+                        stack.append((j, dependencies(j)))
+                        pending.append(0)
+                        break
+                    # Sisi balik (siklus) tidak menambah tingkat
+                else:
+                    stack.pop()
+                    visiting[i] = 0
+                    levels[i] = level = pending.pop()
+                    if pending:
+                        pending[-1] = max(pending[-1], level + 1)
+        return levels
+
+    @property
+    def strata(self) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Urutan evaluasi bertingkat: indeks aturan per tingkat dependensi.
+        Semua aturan di satu tingkat hanya bergantung pada tingkat
+        sebelumnya, sehingga jaringan asiklik cukup dievaluasi sekali sapuan.
+        """
+        if self._strata is None:
+            levels = self._compute_levels()
+            strata: List[List[int]] = [[] for _ in range(max(levels, default=-1) + 1)]
+            for i in self.order:
+                strata[levels[i]].append(i)
+            self._strata = tuple(tuple(stratum) for stratum in strata)
+        return self._strata
+
+    def activate(self, kode: str, missing: List[int], agenda: List[int]):
+        """
+        Menandai satu kode premis sebagai diketahui. Aturan yang seluruh
+        premisnya kini terpenuhi dimasukkan ke agenda (heap berdasarkan urutan topologis).
+        """
+        for i in self.index.get(kode, ()):
+            missing[i] -= 1
+            if missing[i] == 0:
+                heapq.heappush(agenda, self.rank[i])
+
+    def activate_id(self, sym: int, missing: List[int], agenda: List[int]):
+        """
+        Sama seperti activate(), dengan ID simbol sebagai kunci
+        """
+        for i in self.index_ids[sym]:
+            missing[i] -= 1
+            if missing[i] == 0:
+                heapq.heappush(agenda, self.rank[i])
+
+def normalize_gender(gender: str):
+    """
+    Menormalkan input gender menjadi 'pria', 'wanita' atau None jika tidak valid
+    """
+    if not gender:
+        return None
+    if gender.lower() in ['pria', 'laki-laki', 'male', 'p']:
+        return 'pria'
+    if gender.lower() in ['wanita', 'perempuan', 'female', 'w']:
+        return 'wanita'
+    return None
+
+def render_event(event: str, data: Dict) -> str:
+    """
+    Mengubah satu event jejak inferensi menjadi teks berbahasa Indonesia
+    """
+    if event == 'mulai':
+        gender = data.get('gender')
+        if gender == 'pria':
+            aturan = "Menggunakan aturan untuk Pria"
+        elif gender == 'wanita':
+            aturan = "Menggunakan aturan untuk Wanita"
+        else:
+            # Fallback ke aturan umum jika gender tidak diset
+            aturan = "Menggunakan aturan umum (gender tidak diset)"
+        return "\n=== PROSES FORWARD CHAINING ===\n" + aturan
+    if event == 'aturan':
+        return f"Memproses aturan {data['rule_id']}: {list(data['kondisi'])} -> {data['kesimpulan']}"
+    if event == 'cf_aturan':
+        return f"  CF aturan {data['rule_id']}: {data['cf']:.3f}"
+    if event == 'gabung':
+        return f"  Menggabungkan CF: {data['old_cf']:.3f} + {data['cf']:.3f} = {data['new_cf']:.3f}"
+    if event == 'kesimpulan_baru':
+        return f"  Kesimpulan baru: {data['kesimpulan']} dengan CF = {data['cf']:.3f}"
+    if event == 'gender':
+        return f"Gender pasien: {data['gender']}"
+    if event == 'gender_tidak_valid':
+        return "Gender tidak valid! Gunakan 'pria' atau 'wanita'"
+    if event == 'fakta':
+        return f"Fakta ditambahkan: {data['kode']} dengan CF = {data['cf']}"
+    if event == 'fakta_dihapus':
+        return f"Fakta dihapus: {data['kode']}"
+    if event == 'reset':
+        return "Sistem telah direset. Siap untuk diagnosa baru."
+    return f"{event}: {data}"
+
+
+class TraceRecorder:
+    """
+    Perekam jejak inferensi terstruktur. Setiap event disimpan sebagai
+    tuple (nama_event, data) tanpa format teks.
+    """
+    def __init__(self):
+        self.events: List[Tuple[str, Dict]] = []
+
+    def emit(self, event: str, **data):
+        self.events.append((event, data))
+
+    def render(self) -> str:
+        """
+        Menampilkan event yang terekam sebagai teks jejak
+        """
+        return "\n".join(render_event(event, data) for event, data in self.events)
+
+
+class PrintTrace:
+    """
+    Renderer jejak yang langsung mencetak teks ke stdout
+    (perilaku lama CLI)
+    """
+    def emit(self, event: str, **data):
+        print(render_event(event, data))
+
+
+class RuleStats:
+    """
+    Statistik satu aturan yang dikumpulkan RuleProfiler
+    """
+    __slots__ = ('maka', 'evaluasi', 'gagal_premis', 'aktif', 'waktu_ns', 'delta_cf')
+
+    def __init__(self, maka: str):
+        self.maka = maka
+        self.evaluasi = 0       # aturan dievaluasi (semua premis diketahui)
+        self.gagal_premis = 0   # sebagian premis diketahui, tetapi tidak semua
+        self.aktif = 0          # CF aturan > 0 sehingga kesimpulan diperbarui
+        self.waktu_ns = 0       # waktu kumulatif evaluasi dan penggabungan CF
+        self.delta_cf = 0.0     # total perubahan CF kesimpulan akibat aturan ini
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RuleProfiler:
+    """
+    Profiler opsional untuk infer(): mencatat per aturan jumlah evaluasi,
+    kegagalan premis, jumlah aktif, waktu kumulatif dan perubahan CF
+    kesimpulan (termasuk lewat combine_cf_parallel). Tanpa profiler
+    (default None), infer() hanya membayar satu pengecekan None per aturan.
+    Satu instance tidak thread-safe; gunakan satu profiler per thread.
+    """
+    def __init__(self):
+        # (jaringan, id aturan) -> RuleStats; jaringan 'pria', 'wanita' atau 'umum'
+        self.stats: Dict[Tuple[str, str], RuleStats] = {}
+        self.diagnosa = 0
+
+    def record(self, jaringan: str, rule: 'Rule', elapsed_ns: int, fired: bool, delta_cf: float):
+        """
+        Dipanggil infer() setiap kali satu aturan dievaluasi
+        """
+        key = (jaringan, rule.id)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = RuleStats(rule.maka)
+        stats.evaluasi += 1
+        stats.waktu_ns += elapsed_ns
+        if fired:
+            stats.aktif += 1
+            stats.delta_cf += delta_cf
+
+    def finish(self, jaringan: str, network: 'RuleNetwork', missing: List[int]):
+        """
+        Dipanggil infer() di akhir diagnosa: aturan yang premisnya baru
+        sebagian terpenuhi dicatat sebagai kegagalan premis
+        """
+        self.diagnosa += 1
+        counts = network.premise_counts
+        for i, remaining in enumerate(missing):
+            if 0 < remaining < counts[i]:
+                rule = network.rules[i]
+                key = (jaringan, rule.id)
+                stats = self.stats.get(key)
+                if stats is None:
+                    stats = self.stats[key] = RuleStats(rule.maka)
+                stats.gagal_premis += 1
+
+    def reset(self):
+        self.stats.clear()
+        self.diagnosa = 0
+
+    def to_dict(self) -> Dict:
+        """
+        Statistik dalam bentuk JSON, aturan termahal lebih dulu
+        """
+        items = sorted(self.stats.items(), key=lambda item: item[1].waktu_ns, reverse=True)
+        return {
+            'diagnosa': self.diagnosa,
+            'aturan': [
+                {'jaringan': jaringan, 'id': rule_id, 'maka': stats.maka,
+                 'evaluasi': stats.evaluasi, 'gagal_premis': stats.gagal_premis,
+                 'aktif': stats.aktif, 'waktu_ns': stats.waktu_ns, 'delta_cf': stats.delta_cf}
+                for (jaringan, rule_id), stats in items
+            ],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+
+    def render_prometheus(self, prefix: str = 'diagnosa_aturan') -> str:
+        """
+        Statistik dalam format teks Prometheus
+        """
+        metrics = (
+            ('evaluasi_total', 'evaluasi'),
+            ('gagal_premis_total', 'gagal_premis'),
+            ('aktif_total', 'aktif'),
+            ('waktu_detik_total', 'waktu_ns'),
+            ('delta_cf_total', 'delta_cf'),
+        )
+        lines = [f'# TYPE {prefix}_diagnosa_total counter', f'{prefix}_diagnosa_total {self.diagnosa}']
+        items = sorted(self.stats.items())
+        for name, attr in metrics:
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            for (jaringan, rule_id), stats in items:
+                value = getattr(stats, attr)
+                if attr == 'waktu_ns':
+                    value /= 1e9
+                lines.append(f'{prefix}_{name}{{jaringan="{_escape_label(jaringan)}",'
+                             f'aturan="{_escape_label(rule_id)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class Provenance:
+    """
+    DAG asal-usul (provenance) yang dibangun infer() dalam satu kali jalan:
+    fakta -> aturan -> kesimpulan, dengan CF pada setiap sisi. Sisi premis
+    membawa CF premis saat aturan dievaluasi; sisi kesimpulan membawa CF
+    aturan dan CF kesimpulan setelah digabung.
+    """
+    def __init__(self):
+        # kode -> (CF_user, CF premis = CF_pakar * CF_user)
+        self.facts: Dict[str, Tuple[float, float]] = {}
+        # (id, maka, ((kode, CF, dari_fakta), ...), CF aturan, CF kesimpulan sesudahnya atau None)
+        self.rules: List[Tuple] = []
+        self.conclusions: Dict[str, float] = {}
+
+    def add_fact(self, kode: str, cf_user: float, cf: float):
+        self.facts[kode] = (cf_user, cf)
+
+    def add_rule(self, rule: 'Rule', premis: Tuple, cf: float, cf_kesimpulan: float = None):
+        self.rules.append((rule.id, rule.maka, premis, cf, cf_kesimpulan))
+
+    def finish(self, conclusions: Dict):
+        self.conclusions = dict(conclusions)
+
+    def ancestors(self, kode: str) -> 'Provenance':
+        """
+        Sub-DAG yang menjelaskan satu kesimpulan: aturan aktif yang
+        menghasilkannya beserta seluruh premis dan asal-usulnya
+        """
+        sub = Provenance()
+        needed = {kode}
+        # Aturan dicatat dalam urutan evaluasi (topologis), sehingga
+        # penelusuran mundur cukup satu sapuan dari belakang
+        for entry in reversed(self.rules):
+            rule_id, maka, premis, cf, cf_kesimpulan = entry
+            if cf_kesimpulan is None or maka not in needed:
+                continue
+            sub.rules.append(entry)
+            for premis_kode, _, dari_fakta in premis:
+                if dari_fakta:
+                    sub.facts[premis_kode] = self.facts[premis_kode]
+                else:
+                    needed.add(premis_kode)
+        sub.rules.reverse()
+        sub.facts = {k: self.facts[k] for k in self.facts if k in sub.facts}
+        sub.conclusions = {k: cf for k, cf in self.conclusions.items() if k in needed}
+        return sub
+
+    def to_dict(self) -> Dict:
+        """
+        Bentuk JSON DAG: simpul fakta, aturan (dengan sisi premis) dan kesimpulan
+        """
+        return {
+            'fakta': [{'kode': kode, 'cf_user': cf_user, 'cf': cf}
+                      for kode, (cf_user, cf) in self.facts.items()],
+            'aturan': [
+                {'id': rule_id, 'maka': maka, 'cf': cf, 'aktif': cf_kesimpulan is not None,
+                 'cf_kesimpulan': cf_kesimpulan,
+                 'premis': [{'kode': kode, 'cf': premis_cf, 'sumber': 'fakta' if dari_fakta else 'kesimpulan'}
+                            for kode, premis_cf, dari_fakta in premis]}
+                for rule_id, maka, premis, cf, cf_kesimpulan in self.rules
+            ],
+            'kesimpulan': [{'kode': kode, 'cf': cf} for kode, cf in self.conclusions.items()],
+        }
+
+    def to_dot(self, only_fired: bool = False) -> str:
         """
-        Inisialisasi sistem pakar diagnosa depresi
+        DAG dalam format Graphviz DOT. Aturan yang tidak aktif digambar putus-putus.
         """
+        lines = ['digraph provenance {', '  rankdir=LR;']
+        for kode, (cf_user, cf) in self.facts.items():
+            lines.append(f'  "fakta:{kode}" [label="{kode}\\nCF {cf:.3f}", shape=ellipse];')
+        for kode, cf in self.conclusions.items():
+            lines.append(f'  "kesimpulan:{kode}" [label="{kode}\\nCF {cf:.3f}", shape=doubleoctagon];')
+        for n, (rule_id, maka, premis, cf, cf_kesimpulan) in enumerate(self.rules):
+            fired = cf_kesimpulan is not None
+            if only_fired and not fired:
+                continue
+            node = f'aturan:{n}:{rule_id}'
+            style = '' if fired else ', style=dashed'
+            lines.append(f'  "{node}" [label="{rule_id}\\nCF {cf:.3f}", shape=box{style}];')
+            for kode, premis_cf, dari_fakta in premis:
+                source = f'fakta:{kode}' if dari_fakta else f'kesimpulan:{kode}'
+                lines.append(f'  "{source}" -> "{node}" [label="{premis_cf:.3f}"{style}];')
+            if fired:
+                lines.append(f'  "{node}" -> "kesimpulan:{maka}" [label="{cf:.3f} -> {cf_kesimpulan:.3f}"];')
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
+
+
+def combine_cf_parallel(cf1: float, cf2: float) -> float:
+    """
+    Menggabungkan CF untuk aturan paralel (menghasilkan kesimpulan yang sama)
+    CF_combined = CF1 + CF2 - (CF1 * CF2) jika CF1 dan CF2 > 0
+    CF_combined = CF1 + CF2 + (CF1 * CF2) jika CF1 dan CF2 < 0
+    CF_combined = (CF1 + CF2) / (1 - min(|CF1|, |CF2|)) jika CF1 dan CF2 berbeda tanda
+    """
+    if cf1 >= 0 and cf2 >= 0:
+        return cf1 + cf2 - (cf1 * cf2)
+    elif cf1 <= 0 and cf2 <= 0:
+        return cf1 + cf2 + (cf1 * cf2)
+    else:
+        return (cf1 + cf2) / (1 - min(abs(cf1), abs(cf2)))
+
+
+# Nomor urut pemuatan basis pengetahuan dalam proses ini; yang lebih besar
+# dimuat lebih baru (dipakai DiagnosisCache untuk mengenali versi lama)
+_generations = itertools.count()
+
+
+class KnowledgeBase:
+    """
+    Basis pengetahuan terkompilasi yang hanya dibaca (read-only).
+    Satu instance dapat dipakai bersama oleh banyak thread dan sesi
+    diagnosa tanpa locking, karena inferensi tidak pernah mengubahnya.
+    """
+    def __init__(self, data: Dict, rules_file: str = None, version: str = None,
+                 source_stat: Tuple = None, compiled=None):
         self.rules_file = rules_file
-        self.knowledge_base = self.load_knowledge_base()
-        self.facts = {}  # Menyimpan fakta yang diketahui
-        self.conclusions = {}  # Menyimpan kesimpulan dengan CF
-        self.gender = None  # Menyimpan gender pasien
-        
-    def load_knowledge_base(self) -> Dict:
+        self.data = data
+        # Versi basis pengetahuan: hash isi file, dipakai untuk menandai
+        # dan meng-invalidasi hasil yang di-cache
+        if version is None:
+            encoded = json.dumps(data, sort_keys=True).encode('utf-8')
+            version = hashlib.sha256(encoded).hexdigest()[:16]
+        self.version = version
+        self.generation = next(_generations)
+        self.source_stat = source_stat
+        # Artefak biner yang di-mmap (CompiledKnowledgeBase), jika dimuat dari sana
+        self.compiled = compiled
+        self.indexes = self.build_indexes(data)
+        self.build_symbols(data)
+        self.rule_networks = self.compile_rule_networks(data)
+        # Data turunan untuk infer_top, dihitung saat pertama dibutuhkan.
+        # Entri hanya ditambahkan, sehingga aman dipakai bersama antar thread.
+        self._candidate_bounds = {}
+        self._bound_keys = {}
+        self._pruned_networks = {}
+
+    @classmethod
+    def load(cls, rules_file: str = "rules.json", use_compiled: bool = True) -> 'KnowledgeBase':
         """
-        Memuat basis pengetahuan dari file JSON
+        Memuat basis pengetahuan dari file JSON dan mengompilasi
+        jaringan aturan per gender. Jika ada artefak biner hasil
+        kb_compiler.py yang masih sesuai dengan file JSON, artefak itu
+        yang dimuat (via mmap); artefak yang usang diabaikan.
         """
+        if use_compiled:
+            from kb_compiler import load_compiled
+            kb = load_compiled(rules_file)
+            if kb is not None:
+                return kb
+
+        version = None
+        source_stat = None
         try:
-            with open(self.rules_file, 'r', encoding='utf-8') as file:
-                return json.load(file)
+            with open(rules_file, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                raw = file.read()
+            source_stat = (stat.st_mtime_ns, stat.st_size)
+            version = hashlib.sha256(raw).hexdigest()[:16]
+            data = json.loads(raw.decode('utf-8'))
         except FileNotFoundError:
-            print(f"File {self.rules_file} tidak ditemukan!")
-            return {}
-        except json.JSONDecodeError:
-            print(f"Error parsing JSON file {self.rules_file}")
-            return {}
-    
-    def set_gender(self, gender: str):
+            print(f"File {rules_file} tidak ditemukan!")
+            data = {}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            print(f"Error parsing JSON file {rules_file}")
+            data = {}
+        return cls(data, rules_file, version, source_stat)
+
+    def source_changed(self) -> bool:
         """
-        Set gender pasien (pria/wanita)
+        Mengecek apakah file sumber sudah berubah sejak dimuat (mtime/ukuran)
         """
-        if gender.lower() in ['pria', 'laki-laki', 'male', 'p']:
-            self.gender = 'pria'
-        elif gender.lower() in ['wanita', 'perempuan', 'female', 'w']:
-            self.gender = 'wanita'
-        else:
-            print("Gender tidak valid! Gunakan 'pria' atau 'wanita'")
+        if self.rules_file is None or self.source_stat is None:
             return False
-        print(f"Gender pasien: {self.gender}")
-        return True
+        try:
+            stat = os.stat(self.rules_file)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) != self.source_stat
 
-    def add_fact(self, gejala_kode: str, cf_user: float = 1.0):
+    def build_indexes(self, data: Dict) -> Dict:
         """
-        Menambahkan fakta gejala dengan tingkat keyakinan user
+        Membangun indeks kode -> data untuk gejala, penyakit dan komplikasi
+        sehingga pencarian informasi berjalan O(1)
         """
-        self.facts[gejala_kode] = cf_user
-        print(f"Fakta ditambahkan: {gejala_kode} dengan CF = {cf_user}")
-    
+        indexes = {}
+        for section in ('gejala', 'penyakit', 'komplikasi'):
+            index = {}
+            for item in data.get(section, []):
+                # Data pertama menang, sama seperti pencarian linear sebelumnya
+                index.setdefault(item['kode'], item)
+            indexes[section] = MappingProxyType(index)
+        return MappingProxyType(indexes)
+
+    def build_symbols(self, data: Dict):
+        """
+        Membangun tabel simbol: setiap kode (gejala, penyakit, komplikasi
+        dan kode lain pada aturan) mendapat ID bilangan bulat, sehingga
+        inferensi dapat memakai array rapat alih-alih dict berkunci string.
+        gejala_cf[ID] berisi CF pakar, atau None jika kode bukan gejala.
+        """
+        symbol_ids: Dict[str, int] = {}
+        for section in ('gejala', 'penyakit', 'komplikasi'):
+            for kode in self.indexes[section]:
+                symbol_ids.setdefault(kode, len(symbol_ids))
+        for section in ('aturan_pria', 'aturan_wanita', 'aturan'):
+            for rule in data.get(section, []):
+                for kode in rule.get('jika', []):
+                    symbol_ids.setdefault(kode, len(symbol_ids))
+                symbol_ids.setdefault(rule.get('maka', ''), len(symbol_ids))
+        self.symbols = tuple(symbol_ids)
+        self.symbol_ids = MappingProxyType(symbol_ids)
+        gejala = self.indexes['gejala']
+        self.gejala_cf = tuple(
+            gejala[kode].get('cf_pakar', 0.0) if kode in gejala else None
+            for kode in self.symbols
+        )
+
+    def compile_rule_networks(self, data: Dict) -> Dict:
+        """
+        Mengompilasi jaringan aturan per gender, sekali per basis pengetahuan.
+        Aturan umum (komplikasi, dll) ditambahkan setelah aturan gender;
+        objek Rule-nya dipakai bersama oleh semua jaringan.
+        """
+        n_symbols = len(self.symbols)
+        rules = {
+            section: [Rule(rule, self.symbol_ids) for rule in data.get(section, [])]
+            for section in ('aturan_pria', 'aturan_wanita', 'aturan')
+        }
+        general_rules = rules['aturan']
+        return MappingProxyType({
+            'pria': RuleNetwork(rules['aturan_pria'] + general_rules, n_symbols),
+            'wanita': RuleNetwork(rules['aturan_wanita'] + general_rules, n_symbols),
+            None: RuleNetwork(general_rules, n_symbols),
+        })
+
     def get_gejala_info(self, kode: str) -> Dict:
         """
         Mendapatkan informasi gejala berdasarkan kode
         """
-        for gejala in self.knowledge_base.get('gejala', []):
-            if gejala['kode'] == kode:
-                return gejala
-        return {}
-    
+        return self.indexes['gejala'].get(kode, {})
+
     def get_penyakit_info(self, kode: str) -> Dict:
         """
         Mendapatkan informasi penyakit berdasarkan kode
         """
-        for penyakit in self.knowledge_base.get('penyakit', []):
-            if penyakit['kode'] == kode:
-                return penyakit
-        return {}
-    
+        return self.indexes['penyakit'].get(kode, {})
+
     def get_komplikasi_info(self, kode: str) -> Dict:
         """
         Mendapatkan informasi komplikasi berdasarkan kode
         """
-        for komplikasi in self.knowledge_base.get('komplikasi', []):
-            if komplikasi['kode'] == kode:
-                return komplikasi
-        return {}
-    
-    def calculate_cf_gejala(self, gejala_kode: str) -> float:
+        return self.indexes['komplikasi'].get(kode, {})
+
+    def calculate_cf_gejala(self, gejala_kode: str, facts: Dict) -> float:
         """
         Menghitung CF gejala berdasarkan CF pakar dan CF user
         CF = CF_pakar * CF_user
@@ -83,13 +640,13 @@ class DepressionExpertSystem:
         gejala_info = self.get_gejala_info(gejala_kode)
         if not gejala_info:
             return 0.0
-        
+
         cf_pakar = gejala_info.get('cf_pakar', 0.0)
-        cf_user = self.facts.get(gejala_kode, 1.0)
-        
+        cf_user = facts.get(gejala_kode, 1.0)
+
         return cf_pakar * cf_user
-    
-    def calculate_cf_rule(self, rule: Dict) -> float:
+
+    def calculate_cf_rule(self, rule: Dict, facts: Dict, conclusions: Dict) -> float:
         """
         Menghitung CF aturan berdasarkan gejala yang ada
         CF_rule = min(CF_gejala) * CF_rule
@@ -97,116 +654,119 @@ class DepressionExpertSystem:
         gejala_list = rule.get('jika', [])
         if not gejala_list:
             return 0.0
-        
+
         # Hitung CF minimum dari semua gejala dalam aturan
         cf_gejala_list = []
         for gejala_kode in gejala_list:
-            if gejala_kode in self.facts:
-                cf_gejala = self.calculate_cf_gejala(gejala_kode)
+            if gejala_kode in facts:
+                cf_gejala = self.calculate_cf_gejala(gejala_kode, facts)
                 cf_gejala_list.append(cf_gejala)
-        
+            elif gejala_kode in conclusions:
+                # Premis hasil aturan lain (aturan sekuensial)
+                cf_gejala_list.append(conclusions[gejala_kode])
+
         if not cf_gejala_list:
             return 0.0
-        
+
         min_cf_gejala = min(cf_gejala_list)
         cf_rule = rule.get('cf_rule', 0.0)
-        
+
         return min_cf_gejala * cf_rule
-    
-    def combine_cf_parallel(self, cf1: float, cf2: float) -> float:
+
+    def is_result_code(self, kode: str) -> bool:
         """
-        Menggabungkan CF untuk aturan paralel (menghasilkan kesimpulan yang sama)
-        CF_combined = CF1 + CF2 - (CF1 * CF2) jika CF1 dan CF2 > 0
-        CF_combined = CF1 + CF2 + (CF1 * CF2) jika CF1 dan CF2 < 0
-        CF_combined = (CF1 + CF2) / (1 - min(|CF1|, |CF2|)) jika CF1 dan CF2 berbeda tanda
-        """
-        if cf1 >= 0 and cf2 >= 0:
-            return cf1 + cf2 - (cf1 * cf2)
-        elif cf1 <= 0 and cf2 <= 0:
-            return cf1 + cf2 + (cf1 * cf2)
-        else:
-            return (cf1 + cf2) / (1 - min(abs(cf1), abs(cf2)))
-    
-    def forward_chaining(self) -> Dict:
+        Kode yang ditampilkan sebagai hasil diagnosa: penyakit (D*) dan komplikasi (K*)
         """
-        Implementasi forward chaining untuk inferensi
+        if kode.startswith('D'):
+            return kode in self.indexes['penyakit']
+        if kode.startswith('K'):
+            return kode in self.indexes['komplikasi']
+        return False
+
+    def candidate_bounds(self, key) -> List[Tuple[float, str]]:
         """
-        print("\n=== PROSES FORWARD CHAINING ===")
-        
-        # Reset kesimpulan
-        self.conclusions = {}
-        
-        # Dapatkan aturan berdasarkan gender
-        if self.gender == 'pria':
-            rules = self.knowledge_base.get('aturan_pria', [])
-            print("Menggunakan aturan untuk Pria")
-        elif self.gender == 'wanita':
-            rules = self.knowledge_base.get('aturan_wanita', [])
-            print("Menggunakan aturan untuk Wanita")
-        else:
-            # Fallback ke aturan umum jika gender tidak diset
-            rules = self.knowledge_base.get('aturan', [])
-            print("Menggunakan aturan umum (gender tidak diset)")
-        
-        # Tambahkan aturan umum (komplikasi, dll)
-        general_rules = self.knowledge_base.get('aturan', [])
-        rules.extend(general_rules)
-        
-        # Proses aturan secara iteratif sampai tidak ada perubahan
-        changed = True
-        iteration = 1
-        
-        while changed:
-            changed = False
-            print(f"\n--- Iterasi {iteration} ---")
-            
-            for rule in rules:
-                rule_id = rule.get('id', '')
-                kondisi = rule.get('jika', [])
-                kesimpulan = rule.get('maka', '')
-                cf_rule = rule.get('cf_rule', 0.0)
-                
-                print(f"Memproses aturan {rule_id}: {kondisi} -> {kesimpulan}")
-                
-                # Cek apakah semua kondisi terpenuhi
-                kondisi_terpenuhi = True
-                for kondisi_kode in kondisi:
-                    if kondisi_kode not in self.facts and kondisi_kode not in self.conclusions:
-                        kondisi_terpenuhi = False
-                        break
-                
-                if kondisi_terpenuhi:
-                    # Hitung CF aturan
-                    cf_calculated = self.calculate_cf_rule(rule)
-                    print(f"  CF aturan {rule_id}: {cf_calculated:.3f}")
-                    
-                    if cf_calculated > 0:
-                        # Jika kesimpulan sudah ada, gabungkan CF (aturan paralel)
-                        if kesimpulan in self.conclusions:
-                            old_cf = self.conclusions[kesimpulan]
-                            new_cf = self.combine_cf_parallel(old_cf, cf_calculated)
-                            print(f"  Menggabungkan CF: {old_cf:.3f} + {cf_calculated:.3f} = {new_cf:.3f}")
-                            self.conclusions[kesimpulan] = new_cf
-                        else:
-                            self.conclusions[kesimpulan] = cf_calculated
-                            print(f"  Kesimpulan baru: {kesimpulan} dengan CF = {cf_calculated:.3f}")
-                        
-                        changed = True
-            
-            iteration += 1
-            if iteration > 10:  # Mencegah infinite loop
-                break
-        
-        return self.conclusions
-    
-    def get_diagnosis_results(self) -> List[Tuple[str, str, float]]:
+        Batas atas CF setiap kandidat hasil diagnosa pada satu jaringan
+        aturan, terurut dari yang tertinggi: [(batas atas, kode)].
+        Batas dihitung tanpa melihat fakta dengan menganggap |CF_user| <= 1:
+        premis gejala paling tinggi |CF_pakar|, aturan paling tinggi
+        cf_rule * min(batas premis), dan kesimpulan paling tinggi kombinasi
+        paralel semua aturan penghasilnya. Kandidat berbatas 0 tidak pernah
+        dapat disimpulkan dan tidak dicantumkan. Mengembalikan None untuk
+        jaringan bersiklus (batas satu sapuan tidak berlaku).
+        """
+        if key in self._candidate_bounds:
+            return self._candidate_bounds[key]
+        network = self.rule_networks[key]
+        bounds = None
+        if network.acyclic:
+            upper = [abs(cf) if cf is not None else 0.0 for cf in self.gejala_cf]
+            for i in network.order:
+                rule = network.rules[i]
+                if not rule.premis_id or rule.cf_rule <= 0:
+                    continue
+                cf = min([upper[sym] for sym in rule.premis_id]) * rule.cf_rule
+                if cf > 0:
+                    old = upper[rule.maka_id]
+                    upper[rule.maka_id] = old + cf - old * cf
+            bounds = sorted(
+                ((upper[self.symbol_ids[kode]], kode) for kode in network.producers
+                 if self.is_result_code(kode) and upper[self.symbol_ids[kode]] > 0),
+                key=lambda item: item[0], reverse=True)
+            # Kunci bisect (menaik) untuk candidates_above
+            self._bound_keys[key] = [-bound for bound, _ in bounds]
+        self._candidate_bounds[key] = bounds
+        return bounds
+
+    def candidates_above(self, key, threshold: float) -> int:
         """
-        Mendapatkan hasil diagnosa yang sudah diurutkan berdasarkan CF
+        Jumlah kandidat dengan batas atas CF >= threshold (jaringan asiklik)
+        """
+        self.candidate_bounds(key)
+        return bisect.bisect_right(self._bound_keys[key], -threshold)
+
+    def pruned_network(self, key, size: int) -> RuleNetwork:
+        """
+        Jaringan aturan yang hanya berisi aturan yang dibutuhkan untuk
+        menghitung `size` kandidat dengan batas atas tertinggi (beserta
+        semua aturan penghasil premis berantainya), sehingga CF kandidat
+        tersebut tetap eksak. size dibulatkan ke atas menjadi pangkat dua
+        agar jumlah jaringan yang di-cache tetap kecil.
+        """
+        bounds = self.candidate_bounds(key)
+        size = min(len(bounds), 1 << max(0, size - 1).bit_length())
+        cache_key = (key, size)
+        network = self._pruned_networks.get(cache_key)
+        if network is not None:
+            return network
+        full = self.rule_networks[key]
+        needed = [kode for _, kode in bounds[:size]]
+        seen = set(needed)
+        selected = set()
+        while needed:
+            for i in full.producers.get(needed.pop(), ()):
+                if i in selected:
+                    continue
+                selected.add(i)
+                for kode in full.premises[i]:
+                    if kode not in seen:
+                        seen.add(kode)
+                        needed.append(kode)
+        network = RuleNetwork([full.rules[i] for i in sorted(selected)], len(self.symbols))
+        self._pruned_networks[cache_key] = network
+        return network
+
+    def diagnosis_results(self, conclusions: Dict, top_k: int = None,
+                          min_cf: float = None) -> List[Tuple[str, str, float]]:
+        """
+        Mendapatkan hasil diagnosa yang sudah diurutkan berdasarkan CF.
+        Dengan `min_cf` hanya hasil ber-CF >= min_cf yang dikembalikan;
+        dengan `top_k` hanya k hasil teratas, dipilih dengan heap
+        (heapq.nlargest) alih-alih mengurutkan semua hasil.
         """
         results = []
-        
+
         # Proses kesimpulan penyakit
-        for kode, cf in self.conclusions.items():
+        for kode, cf in conclusions.items():
             if kode.startswith('D'):  # Penyakit
                 penyakit_info = self.get_penyakit_info(kode)
                 if penyakit_info:
@@ -215,10 +775,754 @@ class DepressionExpertSystem:
                 komplikasi_info = self.get_komplikasi_info(kode)
                 if komplikasi_info:
                     results.append((kode, komplikasi_info['nama'], cf))
-        
+
+        if min_cf is not None:
+            results = [result for result in results if result[2] >= min_cf]
+        if top_k is not None:
+            return heapq.nlargest(top_k, results, key=lambda x: x[2])
         # Urutkan berdasarkan CF (tertinggi dulu)
         results.sort(key=lambda x: x[2], reverse=True)
         return results
+
+
+_shared_knowledge_bases: Dict[str, KnowledgeBase] = {}
+# mtime/ukuran terakhir yang ditolak per path, agar file yang sama tidak
+# dibaca dan dilaporkan ulang setiap panggilan
+_rejected_sources: Dict[str, Tuple] = {}
+_shared_lock = threading.Lock()
+
+
+def load_shared_knowledge_base(rules_file: str = "rules.json") -> KnowledgeBase:
+    """
+    Mendapatkan basis pengetahuan yang dipakai bersama dalam satu proses.
+    File hanya dibaca dan dikompilasi sekali per path, dan dimuat ulang
+    jika file berubah. Seperti KnowledgeBaseWatcher, isi baru divalidasi
+    dulu; jika tidak valid, basis pengetahuan terakhir yang valid tetap
+    dipakai sampai file berubah lagi.
+    """
+    path = os.path.abspath(rules_file)
+    kb = _shared_knowledge_bases.get(path)
+    if kb is None or kb.source_changed():
+        with _shared_lock:
+            kb = _shared_knowledge_bases.get(path)
+            if kb is None or kb.source_changed():
+                kb = _reload_shared(path, rules_file, kb)
+    return kb
+
+
+def _reload_shared(path: str, rules_file: str, current: Optional[KnowledgeBase]) -> KnowledgeBase:
+    """
+    Memuat ulang rules_file untuk load_shared_knowledge_base (lock sudah dipegang)
+    """
+    try:
+        stat = os.stat(rules_file)
+        source_stat = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        source_stat = None
+    if current is not None and source_stat is not None and _rejected_sources.get(path) == source_stat:
+        return current
+
+    try:
+        kb = KnowledgeBase.load(rules_file)
+    except (KeyError, TypeError, ValueError) as exc:
+        if current is None:
+            raise
+        message = f"Basis pengetahuan gagal dikompilasi: {exc}"
+    else:
+        # Artefak biner hanya ditulis dari basis pengetahuan yang valid
+        # (kb_compiler), sehingga tidak perlu didekode hanya untuk dicek
+        errors = [] if kb.compiled is not None else validate_knowledge_base(kb.data)
+        if not errors:
+            _shared_knowledge_bases[path] = kb
+            _rejected_sources.pop(path, None)
+            return kb
+        if current is None:
+            # Belum ada versi valid: hasil muat dikembalikan apa adanya
+            # (pemanggil memeriksa kb.data), tetapi tidak disimpan
+            return kb
+        message = '; '.join(errors)
+    _rejected_sources[path] = source_stat
+    print(f"Basis pengetahuan baru ditolak, versi {current.version} tetap dipakai: {message}")
+    return current
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value)
+
+
+def validate_knowledge_base(data) -> List[str]:
+    """
+    Memeriksa struktur isi rules.json sebelum dipakai: bagian wajib ada,
+    setiap gejala/penyakit/komplikasi punya kode dan nama, CF pakar dan
+    CF aturan berupa angka di [-1, 1], serta setiap aturan punya premis
+    (list kode) dan kesimpulan. Mengembalikan daftar pesan kesalahan
+    (kosong jika valid).
+    """
+    if not isinstance(data, dict):
+        return ["Basis pengetahuan harus berupa objek JSON"]
+    errors = []
+    if 'gejala' not in data:
+        errors.append("Bagian 'gejala' tidak ada")
+    if not any(section in data for section in ('aturan_pria', 'aturan_wanita', 'aturan')):
+        errors.append("Tidak ada bagian aturan (aturan_pria, aturan_wanita atau aturan)")
+
+    for section in ('gejala', 'penyakit', 'komplikasi'):
+        items = data.get(section, [])
+        if not isinstance(items, list):
+            errors.append(f"Bagian '{section}' harus berupa list")
+            continue
+        for i, item in enumerate(items, 1):
+            if not isinstance(item, dict) or not isinstance(item.get('kode'), str) \
+                    or not isinstance(item.get('nama'), str):
+                errors.append(f"{section} ke-{i}: 'kode' dan 'nama' harus berupa string")
+                continue
+            if section == 'gejala':
+                cf_pakar = item.get('cf_pakar', 0.0)
+                if not _is_number(cf_pakar) or not -1.0 <= cf_pakar <= 1.0:
+                    errors.append(f"Gejala {item['kode']}: cf_pakar harus angka di antara -1 dan 1")
+
+    for section in ('aturan_pria', 'aturan_wanita', 'aturan'):
+        rules = data.get(section, [])
+        if not isinstance(rules, list):
+            errors.append(f"Bagian '{section}' harus berupa list")
+            continue
+        for i, rule in enumerate(rules, 1):
+            if not isinstance(rule, dict):
+                errors.append(f"{section} ke-{i}: aturan harus berupa objek")
+                continue
+            name = rule.get('id', f'ke-{i}')
+            jika = rule.get('jika')
+            if not isinstance(jika, list) or not all(isinstance(kode, str) for kode in jika):
+                errors.append(f"Aturan {name} ({section}): 'jika' harus berupa list kode")
+            if not isinstance(rule.get('maka'), str) or not rule.get('maka'):
+                errors.append(f"Aturan {name} ({section}): 'maka' harus berupa kode")
+            cf_rule = rule.get('cf_rule', 0.0)
+            if not _is_number(cf_rule) or not -1.0 <= cf_rule <= 1.0:
+                errors.append(f"Aturan {name} ({section}): cf_rule harus angka di antara -1 dan 1")
+    return errors
+
+
+class KnowledgeBaseWatcher:
+    """
+    Memantau rules.json dan memuat ulang basis pengetahuan saat isinya
+    berubah. Perubahan dideteksi dari mtime/ukuran lalu dipastikan dengan
+    hash isi (versi); file yang hanya di-touch tidak dimuat ulang.
+    Basis pengetahuan baru divalidasi dan dikompilasi di thread pemantau,
+    lalu ditukar secara atomik (satu penugasan referensi `current`).
+    Diagnosa yang sedang berjalan tetap memakai objek lama yang sudah
+    dipegangnya sampai selesai. Jika file baru tidak valid, basis
+    pengetahuan lama tetap dipakai dan pesan kesalahannya disimpan di
+    `last_error`.
+    `on_swap(lama, baru)` dipanggil dari thread pemantau setelah penukaran.
+    """
+    def __init__(self, rules_file: str = "rules.json", interval: float = 1.0, on_swap=None):
+        self.rules_file = rules_file
+        self.interval = interval
+        self.on_swap = on_swap
+        self.current = load_shared_knowledge_base(rules_file)
+        self.swaps = 0
+        self.failures = 0
+        self.last_error = None
+        # mtime/ukuran terakhir yang sudah diperiksa, termasuk versi yang gagal
+        self._seen_stat = self.current.source_stat
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> bool:
+        """
+        Memeriksa file sekali; mengembalikan True jika basis pengetahuan ditukar
+        """
+        with self._lock:
+            try:
+                with open(self.rules_file, 'rb') as file:
+                    stat = os.fstat(file.fileno())
+                    source_stat = (stat.st_mtime_ns, stat.st_size)
+                    if source_stat == self._seen_stat:
+                        return False
+                    raw = file.read()
+            except OSError as exc:
+                # File sedang diganti atau dihapus: coba lagi pada pemeriksaan berikutnya
+                self.last_error = str(exc)
+                return False
+            self._seen_stat = source_stat
+            version = hashlib.sha256(raw).hexdigest()[:16]
+            if version == self.current.version:
+                return False
+
+            try:
+                data = json.loads(raw.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+                return self._reject(f"Error parsing JSON file {self.rules_file}: {exc}")
+            errors = validate_knowledge_base(data)
+            if errors:
+                return self._reject('; '.join(errors))
+            try:
+                kb = KnowledgeBase(data, self.rules_file, version, source_stat)
+            except (KeyError, TypeError, ValueError) as exc:
+                return self._reject(f"Basis pengetahuan gagal dikompilasi: {exc}")
+
+            old = self.current
+            self.current = kb
+            self.swaps += 1
+            self.last_error = None
+            with _shared_lock:
+                _shared_knowledge_bases[os.path.abspath(self.rules_file)] = kb
+        if self.on_swap is not None:
+            self.on_swap(old, kb)
+        return True
+
+    def _reject(self, message: str) -> bool:
+        self.failures += 1
+        self.last_error = message
+        print(f"Basis pengetahuan baru ditolak, versi {self.current.version} tetap dipakai: {message}")
+        return False
+
+    def start(self):
+        """
+        Menjalankan pemantauan berkala di thread daemon
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = str(exc)
+
+
+def infer(kb: KnowledgeBase, gender: str, facts: Dict, trace=None,
+          contributions: Dict = None, profiler: RuleProfiler = None,
+          provenance: Provenance = None, network: RuleNetwork = None) -> Dict:
+    """
+    Forward chaining tanpa state: menghasilkan kesimpulan {kode: CF} dari
+    fakta gejala {kode: CF_user}. Fungsi ini tidak mengubah kb maupun facts,
+    sehingga aman dipanggil dari banyak thread dengan kb yang sama.
+    Jejak inferensi hanya dikirim jika `trace` (objek dengan method emit) diberikan.
+    Jika `contributions` diberikan, CF setiap aturan yang dievaluasi dicatat
+    di sana per indeks aturan (dipakai untuk pembaruan inkremental).
+    Jika `profiler` (RuleProfiler) diberikan, statistik per aturan dicatat.
+    Jika `provenance` (Provenance) diberikan, DAG asal-usul kesimpulan
+    dibangun pada jalan yang sama. `network` dapat menggantikan jaringan
+    aturan gender (mis. jaringan hasil pemangkasan dari infer_top).
+    """
+    if trace is not None:
+        trace.emit('mulai', gender=gender)
+    # Dapatkan jaringan aturan berdasarkan gender
+    if network is None:
+        network = kb.rule_networks.get(gender, kb.rule_networks[None])
+    rules = network.rules
+    order = network.order
+
+    # Nilai premis, penanda fakta dan CF kesimpulan disimpan dalam array
+    # rapat per ID simbol. Nilai premis fakta = CF_pakar * CF_user (0 untuk
+    # kode yang bukan gejala); fakta didahulukan daripada kesimpulan.
+    n_symbols = len(kb.symbols)
+    values = [0.0] * n_symbols
+    is_fact = bytearray(n_symbols)
+    conclusion_cf: List = [None] * n_symbols
+    concluded: List[int] = []
+
+    # Agenda berisi aturan yang premisnya sudah terpenuhi. Setiap aturan
+    # hanya masuk agenda sekali, sehingga hanya diaktifkan sekali.
+    missing = list(network.premise_counts)
+    agenda = list(network.roots)
+    symbol_ids = kb.symbol_ids
+    gejala_cf = kb.gejala_cf
+    for kode, cf_user in facts.items():
+        sym = symbol_ids.get(kode)
+        if sym is None:
+            continue
+        cf_pakar = gejala_cf[sym]
+        values[sym] = 0.0 if cf_pakar is None else cf_pakar * cf_user
+        is_fact[sym] = 1
+        if provenance is not None:
+            provenance.add_fact(kode, cf_user, values[sym])
+        network.activate_id(sym, missing, agenda)
+
+    if profiler is not None:
+        # Jaringan tanpa gender (kunci None) diberi label 'umum', seperti
+        # kb_compiler.NETWORKS, agar label dapat diurutkan dan di-render
+        jaringan = gender if gender is not None and gender in kb.rule_networks else 'umum'
+
+    while agenda:
+        idx = order[heapq.heappop(agenda)]
+        rule = rules[idx]
+        if profiler is not None:
+            start = time.perf_counter_ns()
+            old_cf = conclusion_cf[rule.maka_id]
+
+        # Hitung CF aturan: min(CF premis) * CF_rule
+        if rule.premis_id:
+            cf_calculated = min([values[sym] for sym in rule.premis_id]) * rule.cf_rule
+        else:
+            cf_calculated = 0.0
+        if contributions is not None:
+            contributions[idx] = cf_calculated
+        if provenance is not None:
+            # CF premis dicatat sebelum kesimpulan aturan ini diterapkan
+            premis = tuple((kode, values[sym], is_fact[sym] == 1)
+                           for kode, sym in zip(rule.premis, rule.premis_id))
+        if trace is not None:
+            trace.emit('aturan', rule_id=rule.id, kondisi=rule.jika, kesimpulan=rule.maka)
+            trace.emit('cf_aturan', rule_id=rule.id, cf=cf_calculated)
+
+        if cf_calculated > 0:
+            sym = rule.maka_id
+            old_cf = conclusion_cf[sym]
+            # Jika kesimpulan sudah ada, gabungkan CF (aturan paralel)
+            if old_cf is not None:
+                new_cf = combine_cf_parallel(old_cf, cf_calculated)
+                if trace is not None:
+                    trace.emit('gabung', kesimpulan=rule.maka, old_cf=old_cf,
+                               cf=cf_calculated, new_cf=new_cf)
+                conclusion_cf[sym] = new_cf
+                if not is_fact[sym]:
+                    values[sym] = new_cf
+            else:
+                conclusion_cf[sym] = cf_calculated
+                concluded.append(sym)
+                if trace is not None:
+                    trace.emit('kesimpulan_baru', kesimpulan=rule.maka, cf=cf_calculated)
+                if not is_fact[sym]:
+                    values[sym] = cf_calculated
+                    # Jadwalkan aturan yang bergantung pada kesimpulan baru
+                    network.activate_id(sym, missing, agenda)
+
+        if profiler is not None:
+            fired = cf_calculated > 0
+            delta_cf = conclusion_cf[rule.maka_id] - (old_cf or 0.0) if fired else 0.0
+            profiler.record(jaringan, rule, time.perf_counter_ns() - start, fired, delta_cf)
+        if provenance is not None:
+            provenance.add_rule(rule, premis, cf_calculated,
+                                conclusion_cf[rule.maka_id] if cf_calculated > 0 else None)
+
+    if profiler is not None:
+        profiler.finish(jaringan, network, missing)
+    # Batas API: kesimpulan dikembalikan sebagai dict {kode: CF}
+    symbols = kb.symbols
+    conclusions = {symbols[sym]: conclusion_cf[sym] for sym in concluded}
+    if provenance is not None:
+        provenance.finish(conclusions)
+    return conclusions
+
+
+def infer_top(kb: KnowledgeBase, gender: str, facts: Dict, top_k: int = None,
+              min_cf: float = None, trace=None) -> Tuple[Dict, List[Tuple[str, str, float]]]:
+    """
+    Inferensi yang hanya mencari hasil diagnosa teratas: paling banyak
+    `top_k` hasil dan/atau hanya yang ber-CF >= `min_cf` (mis. tingkat
+    0.8/0.6/0.4 pada print_diagnosis). Mengembalikan (kesimpulan, hasil).
+
+    Kandidat yang batas atas CF-nya (KnowledgeBase.candidate_bounds) di
+    bawah min_cf tidak dapat masuk hasil, sehingga aturan yang hanya
+    dibutuhkan kandidat tersebut tidak dievaluasi (pruned_network). Untuk
+    top_k, jika jaringan untuk k kandidat berbatas atas tertinggi jauh
+    lebih kecil, jaringan itu dicoba lebih dulu: hasil di atas batas atas
+    kandidat ke-k sudah pasti termasuk k teratas. Jika kurang dari k,
+    inferensi diulang dengan semua kandidat >= min_cf.
+    Hasil sama dengan diagnosis_results(infer(...), top_k, min_cf); urutan
+    hasil ber-CF sama dapat berbeda. Batas atas hanya berlaku untuk
+    |CF_user| <= 1; fakta di luar rentang itu (atau NaN) diinferensi penuh.
+    """
+    key = gender if gender in kb.rule_networks else None
+    bounds = kb.candidate_bounds(key)
+    if bounds is None or not all(-1.0 <= cf <= 1.0 for cf in facts.values()):
+        # Jaringan bersiklus atau CF di luar [-1, 1]: tanpa pemangkasan
+        conclusions = infer(kb, gender, facts, trace)
+        return conclusions, kb.diagnosis_results(conclusions, top_k, min_cf)
+
+    floor = min_cf if min_cf is not None else 0.0
+    n_floor = kb.candidates_above(key, floor)
+    network = kb.pruned_network(key, n_floor)
+    if top_k is not None and 0 < top_k < n_floor:
+        threshold = max(floor, bounds[top_k - 1][0])
+        narrow = kb.pruned_network(key, kb.candidates_above(key, threshold))
+        # Percobaan ini hanya sepadan jika jaringannya paling banyak 1/4 jaringan penuh
+        if len(narrow.rules) * 4 <= len(network.rules):
+            conclusions = infer(kb, gender, facts, trace, network=narrow)
+            results = kb.diagnosis_results(conclusions, top_k, threshold)
+            if len(results) == top_k:
+                return conclusions, results
+
+    conclusions = infer(kb, gender, facts, trace, network=network)
+    return conclusions, kb.diagnosis_results(conclusions, top_k, floor)
+
+
+class DiagnosisCache:
+    """
+    Cache LRU (dengan TTL opsional) untuk hasil inferensi. Kunci cache adalah
+    gender dan fakta yang diurutkan; versi basis pengetahuan ikut dicek
+    sehingga cache otomatis dikosongkan saat rules.json berubah.
+    Aman dipakai bersama oleh banyak thread.
+    """
+    def __init__(self, maxsize: int = 4096, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._generation = -1
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(gender: str, facts: Dict) -> Tuple:
+        """
+        Kunci kanonik: gender dan pasangan (kode, CF) yang diurutkan
+        """
+        return (gender, tuple(sorted(facts.items())))
+
+    def get(self, kb: KnowledgeBase, gender: str, facts: Dict, with_contributions: bool = False):
+        """
+        Mengembalikan salinan kesimpulan yang di-cache, atau None jika tidak ada.
+        Dengan with_contributions=True mengembalikan (kesimpulan, CF per
+        aturan); CF per aturan None jika tidak ikut disimpan.
+        """
+        key = self.make_key(gender, facts)
+        with self._lock:
+            if not self._check_version(kb):
+                # Diagnosa yang masih memakai versi lama setelah hot reload:
+                # dianggap miss tanpa mengosongkan cache versi baru
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if with_contributions:
+                contributions = entry[2]
+                return dict(entry[1]), None if contributions is None else dict(contributions)
+            return dict(entry[1])
+
+    def put(self, kb: KnowledgeBase, gender: str, facts: Dict, conclusions: Dict,
+            contributions: Dict = None):
+        """
+        Menyimpan kesimpulan hasil inferensi, opsional beserta CF per aturan
+        (untuk pembaruan inkremental setelah cache hit). Hasil dari versi
+        basis pengetahuan selain versi cache saat ini (diagnosa yang masih
+        berjalan dengan versi lama setelah hot reload) tidak disimpan.
+        """
+        key = self.make_key(gender, facts)
+        with self._lock:
+            if not self._check_version(kb):
+                return
+            self._entries[key] = (time.monotonic(), dict(conclusions),
+                                  None if contributions is None else dict(contributions))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _check_version(self, kb: KnowledgeBase) -> bool:
+        """
+        Menyesuaikan cache dengan versi basis pengetahuan. Basis pengetahuan
+        yang dimuat lebih baru dengan versi berbeda mengosongkan cache;
+        yang dimuat lebih dulu (versi lama) ditolak dengan False.
+        """
+        if kb.version == self._version:
+            return True
+        if kb.generation < self._generation:
+            return False
+        self._entries.clear()
+        self._version = kb.version
+        self._generation = kb.generation
+        return True
+
+    def clear(self):
+        """
+        Mengosongkan cache dan statistik
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """
+        Statistik cache: jumlah hit, miss, hit rate dan ukuran
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'versi_kb': self._version,
+            }
+
+
+class DepressionExpertSystem:
+    """
+    Sesi diagnosa untuk satu pasien. Menyimpan gender, fakta dan kesimpulan;
+    basis pengetahuan terkompilasi dipakai bersama antar sesi.
+    """
+    def __init__(self, rules_file: str = "rules.json", knowledge_base: KnowledgeBase = None,
+                 trace=None, cache: DiagnosisCache = None, profiler: RuleProfiler = None,
+                 explain: bool = False):
+        """
+        Inisialisasi sistem pakar diagnosa depresi.
+        `trace` adalah sink jejak opsional (TraceRecorder, PrintTrace, dll);
+        default None berarti tanpa jejak. `cache` adalah DiagnosisCache
+        opsional yang dapat dipakai bersama antar sesi. `profiler` adalah
+        RuleProfiler opsional untuk statistik per aturan. Dengan
+        explain=True, forward_chaining juga menyimpan DAG asal-usul
+        kesimpulan di `provenance`.
+        """
+        self.rules_file = rules_file
+        self.trace = trace
+        self.cache = cache
+        self.profiler = profiler
+        self.explain = explain
+        self.provenance = None
+        if knowledge_base is None:
+            knowledge_base = load_shared_knowledge_base(rules_file)
+        self.kb = knowledge_base
+        self.facts = {}  # Menyimpan fakta yang diketahui
+        self.conclusions = {}  # Menyimpan kesimpulan dengan CF
+        self.gender = None  # Menyimpan gender pasien
+        # CF per aturan dari inferensi terakhir, untuk pembaruan inkremental
+        self._contributions = None
+
+    @property
+    def knowledge_base(self) -> Dict:
+        """
+        Data mentah basis pengetahuan (isi rules.json)
+        """
+        return self.kb.data
+
+    @property
+    def rule_networks(self) -> Dict:
+        return self.kb.rule_networks
+
+    @property
+    def indexes(self) -> Dict:
+        return self.kb.indexes
+
+    def load_knowledge_base(self) -> Dict:
+        """
+        Memuat ulang basis pengetahuan dari file JSON untuk sesi ini
+        """
+        self.kb = KnowledgeBase.load(self.rules_file)
+        self._contributions = None
+        return self.knowledge_base
+
+    def set_knowledge_base(self, kb: KnowledgeBase) -> bool:
+        """
+        Memakai basis pengetahuan lain (mis. KnowledgeBaseWatcher.current
+        setelah hot reload) untuk diagnosa berikutnya. Fakta dan gender
+        dipertahankan; mengembalikan True jika versinya berbeda.
+        """
+        if kb is self.kb or kb.version == self.kb.version:
+            return False
+        self.kb = kb
+        self._contributions = None
+        return True
+
+    def set_gender(self, gender: str):
+        """
+        Set gender pasien (pria/wanita)
+        """
+        normalized = normalize_gender(gender)
+        if normalized is None:
+            if self.trace is not None:
+                self.trace.emit('gender_tidak_valid', gender=gender)
+            return False
+        self.gender = normalized
+        self._contributions = None
+        if self.trace is not None:
+            self.trace.emit('gender', gender=self.gender)
+        return True
+
+    def add_fact(self, gejala_kode: str, cf_user: float = 1.0):
+        """
+        Menambahkan fakta gejala dengan tingkat keyakinan user
+        """
+        self.facts[gejala_kode] = cf_user
+        self._contributions = None
+        if self.trace is not None:
+            self.trace.emit('fakta', kode=gejala_kode, cf=cf_user)
+
+    def update_fact(self, gejala_kode: str, cf_user: float) -> Dict:
+        """
+        Mengubah (atau menambah) satu fakta lalu memperbarui kesimpulan
+        secara inkremental: hanya aturan yang bergantung pada gejala ini dan
+        kesimpulan turunannya (mis. R8/R9) yang dihitung ulang
+        """
+        self.facts[gejala_kode] = cf_user
+        if self.trace is not None:
+            self.trace.emit('fakta', kode=gejala_kode, cf=cf_user)
+        return self._propagate(gejala_kode)
+
+    def retract_fact(self, gejala_kode: str) -> Dict:
+        """
+        Menghapus satu fakta lalu memperbarui kesimpulan secara inkremental
+        """
+        self.facts.pop(gejala_kode, None)
+        if self.trace is not None:
+            self.trace.emit('fakta_dihapus', kode=gejala_kode)
+        return self._propagate(gejala_kode)
+
+    def _propagate(self, kode: str) -> Dict:
+        """
+        Menghitung ulang aturan yang terdampak perubahan satu kode, sesuai
+        urutan topologis, dan meneruskan perubahan kesimpulan ke aturan
+        turunannya. Tanpa hasil inferensi sebelumnya, forward chaining
+        dijalankan penuh.
+        """
+        if self._contributions is None or self.explain:
+            # DAG asal-usul selalu dibangun ulang dari inferensi penuh
+            return self.forward_chaining()
+
+        network = self.kb.rule_networks.get(self.gender, self.kb.rule_networks[None])
+        contributions = self._contributions
+        agenda = [network.rank[i] for i in network.index.get(kode, ())]
+        heapq.heapify(agenda)
+        processed = set()
+
+        while agenda:
+            rank = heapq.heappop(agenda)
+            if rank in processed:
+                continue
+            processed.add(rank)
+            idx = network.order[rank]
+            rule = network.rules[idx]
+            premis = rule.premis
+
+            if premis and all(k in self.facts or k in self.conclusions for k in premis):
+                cf = self.kb.calculate_cf_rule(rule, self.facts, self.conclusions)
+                if contributions.get(idx) == cf:
+                    continue
+                contributions[idx] = cf
+            elif idx in contributions:
+                del contributions[idx]
+            else:
+                continue
+
+            # Gabungkan ulang semua aturan yang menghasilkan kesimpulan ini
+            kesimpulan = rule.maka
+            new_cf = None
+            for j in sorted(network.producers.get(kesimpulan, ()), key=network.rank.__getitem__):
+                cf_j = contributions.get(j)
+                if cf_j is not None and cf_j > 0:
+                    new_cf = cf_j if new_cf is None else combine_cf_parallel(new_cf, cf_j)
+            if new_cf == self.conclusions.get(kesimpulan):
+                continue
+            if new_cf is None:
+                del self.conclusions[kesimpulan]
+            else:
+                self.conclusions[kesimpulan] = new_cf
+            for j in network.index.get(kesimpulan, ()):
+                heapq.heappush(agenda, network.rank[j])
+
+        # Urutan kesimpulan mengikuti urutan aturan pertama yang menghasilkannya
+        def first_rank(item):
+            return min(network.rank[j] for j in network.producers[item[0]]
+                       if contributions.get(j, 0) > 0)
+        self.conclusions = dict(sorted(self.conclusions.items(), key=first_rank))
+        return self.conclusions
+    
+    def get_gejala_info(self, kode: str) -> Dict:
+        """
+        Mendapatkan informasi gejala berdasarkan kode
+        """
+        return self.kb.get_gejala_info(kode)
+    
+    def get_penyakit_info(self, kode: str) -> Dict:
+        """
+        Mendapatkan informasi penyakit berdasarkan kode
+        """
+        return self.kb.get_penyakit_info(kode)
+    
+    def get_komplikasi_info(self, kode: str) -> Dict:
+        """
+        Mendapatkan informasi komplikasi berdasarkan kode
+        """
+        return self.kb.get_komplikasi_info(kode)
+    
+    def calculate_cf_gejala(self, gejala_kode: str) -> float:
+        """
+        Menghitung CF gejala berdasarkan CF pakar dan CF user
+        CF = CF_pakar * CF_user
+        """
+        return self.kb.calculate_cf_gejala(gejala_kode, self.facts)
+    
+    def calculate_cf_rule(self, rule: Dict) -> float:
+        """
+        Menghitung CF aturan berdasarkan gejala yang ada
+        CF_rule = min(CF_gejala) * CF_rule
+        """
+        return self.kb.calculate_cf_rule(rule, self.facts, self.conclusions)
+    
+    def combine_cf_parallel(self, cf1: float, cf2: float) -> float:
+        """
+        Menggabungkan CF untuk aturan paralel (menghasilkan kesimpulan yang sama)
+        """
+        return combine_cf_parallel(cf1, cf2)
+    
+    def forward_chaining(self) -> Dict:
+        """
+        Implementasi forward chaining untuk inferensi
+        """
+        if self.cache is not None and not self.explain:
+            cached = self.cache.get(self.kb, self.gender, self.facts, with_contributions=True)
+            if cached is not None:
+                # CF per aturan ikut di-cache agar update_fact/retract_fact
+                # setelah cache hit tetap inkremental
+                self.conclusions, self._contributions = cached
+                return self.conclusions
+        network = self.kb.rule_networks.get(self.gender, self.kb.rule_networks[None])
+        contributions = {} if network.acyclic else None
+        self.provenance = Provenance() if self.explain else None
+        self.conclusions = infer(self.kb, self.gender, self.facts, self.trace, contributions,
+                                 self.profiler, self.provenance)
+        self._contributions = contributions
+        if self.cache is not None:
+            self.cache.put(self.kb, self.gender, self.facts, self.conclusions, contributions)
+        return self.conclusions
+    
+    def diagnose_batch(self, cf_matrix, genders, symptom_codes: List[str] = None):
+        """
+        Diagnosa banyak pasien sekaligus dengan operasi array NumPy.
+        Lihat vectorized.diagnose_batch.
+        """
+        from vectorized import diagnose_batch
+        return diagnose_batch(self.kb, cf_matrix, genders, symptom_codes)
+
+    def get_diagnosis_results(self, top_k: int = None, min_cf: float = None) -> List[Tuple[str, str, float]]:
+        """
+        Mendapatkan hasil diagnosa yang sudah diurutkan berdasarkan CF,
+        opsional hanya k teratas dan/atau yang ber-CF >= min_cf
+        """
+        return self.kb.diagnosis_results(self.conclusions, top_k, min_cf)
+
+    def forward_chaining_top(self, top_k: int = None, min_cf: float = None) -> List[Tuple[str, str, float]]:
+        """
+        Forward chaining yang dipangkas untuk hasil teratas saja (lihat
+        infer_top). `conclusions` hanya berisi kesimpulan dari aturan yang
+        dievaluasi; mengembalikan hasil diagnosa terurut.
+        """
+        self.conclusions, results = infer_top(self.kb, self.gender, self.facts, top_k, min_cf, self.trace)
+        self._contributions = None
+        return results
     
     def print_diagnosis(self):
         """
@@ -284,7 +1588,10 @@ class DepressionExpertSystem:
         self.facts = {}
         self.conclusions = {}
         self.gender = None
-        print("Sistem telah direset. Siap untuk diagnosa baru.")
+        self._contributions = None
+        self.provenance = None
+        if self.trace is not None:
+            self.trace.emit('reset')
 
 def main():
     """
@@ -293,8 +1600,8 @@ def main():
     print("SISTEM PAKAR DIAGNOSA DEPRESI")
     print("="*40)
     
-    # Inisialisasi sistem
-    system = DepressionExpertSystem()
+    # Inisialisasi sistem dengan jejak inferensi dicetak ke layar
+    system = DepressionExpertSystem(trace=PrintTrace())
     
     if not system.knowledge_base:
         print("Gagal memuat basis pengetahuan!")
@@ -306,7 +1613,12 @@ def main():
     print(f"- {len(system.knowledge_base.get('komplikasi', []))} komplikasi")
     print(f"- {len(system.knowledge_base.get('aturan', []))} aturan")
     
+    # Perubahan rules.json dimuat ulang di latar belakang tanpa restart
+    watcher = KnowledgeBaseWatcher(system.rules_file).start()
+    
     while True:
+        if system.set_knowledge_base(watcher.current):
+            print(f"\nBasis pengetahuan dimuat ulang (versi {system.kb.version})")
         print("\n" + "="*40)
         print("MENU UTAMA")
         print("="*40)
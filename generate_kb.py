@@ -0,0 +1,181 @@
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+from cf_tables import CF_LEVELS
+
+# Sebagian kecil gejala bernilai negatif, seperti G1, G7 dan G16 pada rules.json
+CF_PAKAR_CHOICES = [-0.8, -0.6, -0.4, 0.4, 0.6, 0.8, 1.0]
+CF_PAKAR_WEIGHTS = [0.05, 0.05, 0.05, 0.2, 0.2, 0.35, 0.1]
+CF_RULE_CHOICES = [0.6, 0.7, 0.8, 0.9]
+
+# Bobot level CF user (Pasti Ada .. Pasti Tidak) untuk gejala yang
+# berkaitan dengan penyakit pasien dan untuk gejala lainnya
+RELATED_WEIGHTS = [0.5, 0.3, 0.1, 0.07, 0.03]
+UNRELATED_WEIGHTS = [0.05, 0.1, 0.25, 0.3, 0.3]
+
+
+def _split(codes: List[str], parts: int) -> List[List[str]]:
+    """
+    Membagi daftar kode menjadi beberapa kelompok berurutan yang tidak kosong
+    """
+    size, extra = divmod(len(codes), parts)
+    groups, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(codes[start:end])
+        start = end
+    return groups
+
+
+def generate_knowledge_base(n_gejala: int = 23, n_penyakit: int = 4, n_komplikasi: int = 2,
+                            n_pria: int = 4, n_wanita: int = 4, n_layers: int = 1,
+                            rules_per_layer: int = 2, premis: Tuple[int, int] = (3, 9),
+                            fan_in: Tuple[int, int] = (2, 2), seed: int = 0) -> Dict:
+    """
+    Membuat basis pengetahuan sintetis yang valid terhadap skema rules.json.
+
+    Aturan gender (aturan_pria/aturan_wanita) memakai gejala sebagai premis
+    dan menghasilkan penyakit (D*). Aturan umum (aturan) disusun dalam
+    n_layers lapisan berantai: lapisan pertama memakai penyakit sebagai
+    premis, lapisan berikutnya memakai komplikasi (K*) dari lapisan
+    sebelumnya, sehingga terbentuk rantai D -> K -> K ...
+    """
+    if n_layers > 0 and n_komplikasi < n_layers:
+        raise ValueError("Jumlah komplikasi harus minimal sama dengan jumlah lapisan")
+    if n_gejala < 1 or n_penyakit < 1:
+        raise ValueError("Jumlah gejala dan penyakit harus minimal 1")
+    rng = random.Random(seed)
+    gejala = [f'G{i}' for i in range(1, n_gejala + 1)]
+    penyakit = [f'D{i}' for i in range(1, n_penyakit + 1)]
+    komplikasi = [f'K{i}' for i in range(1, n_komplikasi + 1)]
+
+    data = {
+        'gejala': [
+            {'kode': kode, 'nama': f'Gejala sintetis {kode}',
+             'cf_pakar': rng.choices(CF_PAKAR_CHOICES, CF_PAKAR_WEIGHTS)[0]}
+            for kode in gejala
+        ],
+        'penyakit': [{'kode': kode, 'nama': f'Penyakit sintetis {kode}'} for kode in penyakit],
+        'komplikasi': [{'kode': kode, 'nama': f'Komplikasi sintetis {kode}'} for kode in komplikasi],
+    }
+
+    for section, suffix, count in (('aturan_pria', 'P', n_pria), ('aturan_wanita', 'W', n_wanita)):
+        rules = []
+        for i in range(count):
+            k = min(n_gejala, rng.randint(*premis))
+            rules.append({
+                'id': f'R{i + 1}_{suffix}',
+                'jika': rng.sample(gejala, k),
+                # Setiap penyakit mendapat minimal satu aturan
+                'maka': penyakit[i] if i < n_penyakit else rng.choice(penyakit),
+                'cf_rule': rng.choice(CF_RULE_CHOICES),
+            })
+        data[section] = rules
+
+    general = []
+    previous = penyakit
+    for layer in (_split(komplikasi, n_layers) if n_layers > 0 else []):
+        for i in range(rules_per_layer):
+            k = min(len(previous), rng.randint(*fan_in))
+            general.append({
+                'id': f'R{len(general) + 1}',
+                'jika': rng.sample(previous, k),
+                'maka': layer[i] if i < len(layer) else rng.choice(layer),
+                'cf_rule': rng.choice(CF_RULE_CHOICES),
+            })
+        previous = layer
+    data['aturan'] = general
+    return data
+
+
+def generate_patients(data: Dict, n_patients: int, seed: int = 0,
+                      related_rate: float = 0.85, unrelated_rate: float = 0.2) -> Iterator[Dict]:
+    """
+    Menghasilkan aliran record pasien {'id', 'gender', 'facts'}. Setiap pasien
+    memiliki 1-2 penyakit laten; gejala pada aturan penyakit tersebut lebih
+    sering muncul dengan CF yang mendukung penyakit (searah CF pakar),
+    gejala lain jarang dan cenderung negatif.
+    """
+    rng = random.Random(seed)
+    gejala = [item['kode'] for item in data.get('gejala', [])]
+    cf_pakar = {item['kode']: item.get('cf_pakar', 0.0) for item in data.get('gejala', [])}
+    symptoms_by_gender = {}
+    for gender in ('pria', 'wanita'):
+        by_penyakit: Dict[str, set] = {}
+        for rule in data.get(f'aturan_{gender}', []):
+            by_penyakit.setdefault(rule['maka'], set()).update(rule['jika'])
+        symptoms_by_gender[gender] = by_penyakit
+
+    for i in range(1, n_patients + 1):
+        gender = rng.choice(['pria', 'wanita'])
+        by_penyakit = symptoms_by_gender[gender]
+        related = set()
+        if by_penyakit:
+            for kode in rng.sample(sorted(by_penyakit), min(len(by_penyakit), rng.randint(1, 2))):
+                related |= by_penyakit[kode]
+        facts = {}
+        for kode in gejala:
+            if kode in related:
+                if rng.random() < related_rate:
+                    cf_user = rng.choices(CF_LEVELS, RELATED_WEIGHTS)[0]
+                    facts[kode] = -cf_user if cf_pakar[kode] < 0 else cf_user
+            elif rng.random() < unrelated_rate:
+                facts[kode] = rng.choices(CF_LEVELS, UNRELATED_WEIGHTS)[0]
+        yield {'id': i, 'gender': gender, 'facts': facts}
+
+
+def parse_range(text: str) -> Tuple[int, int]:
+    """
+    Mengurai rentang 'min-max' (atau satu angka) menjadi tuple
+    """
+    low, _, high = text.partition('-')
+    return int(low), int(high or low)
+
+
+def main():
+    """
+    Fungsi utama generator basis pengetahuan dan pasien sintetis
+    """
+    parser = argparse.ArgumentParser(description="Generator basis pengetahuan dan pasien sintetis")
+    parser.add_argument('--gejala', type=int, default=23)
+    parser.add_argument('--penyakit', type=int, default=4)
+    parser.add_argument('--komplikasi', type=int, default=2)
+    parser.add_argument('--aturan-pria', type=int, default=4)
+    parser.add_argument('--aturan-wanita', type=int, default=4)
+    parser.add_argument('--lapisan', type=int, default=1, help="jumlah lapisan aturan berantai")
+    parser.add_argument('--aturan-per-lapisan', type=int, default=2)
+    parser.add_argument('--premis', type=parse_range, default=(3, 9),
+                        help="rentang jumlah premis aturan gender, mis. 3-9")
+    parser.add_argument('--fan-in', type=parse_range, default=(2, 2),
+                        help="rentang jumlah premis aturan berantai, mis. 2-4")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', '-o', default='-', help="file rules.json hasil, default stdout")
+    parser.add_argument('--pasien', type=int, default=0, help="jumlah record pasien yang dibuat")
+    parser.add_argument('--pasien-output', default='pasien.jsonl', help="file JSONL record pasien")
+    args = parser.parse_args()
+
+    try:
+        data = generate_knowledge_base(
+            args.gejala, args.penyakit, args.komplikasi, args.aturan_pria, args.aturan_wanita,
+            args.lapisan, args.aturan_per_lapisan, args.premis, args.fan_in, args.seed)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.output == '-':
+        json.dump(data, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, ensure_ascii=False)
+
+    if args.pasien:
+        with open(args.pasien_output, 'w', encoding='utf-8') as file:
+            for record in generate_patients(data, args.pasien, args.seed):
+                file.write(json.dumps(record) + '\n')
+
+
+if __name__ == "__main__":
+    main()
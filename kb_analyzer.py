@@ -0,0 +1,247 @@
+import argparse
+import json
+import sys
+from typing import Dict, List, Set
+
+from engine import KnowledgeBase, RuleNetwork
+
+# Jaringan aturan yang dianalisis: (kunci di KnowledgeBase.rule_networks, nama)
+NETWORKS = (('pria', 'pria'), ('wanita', 'wanita'), (None, 'umum'))
+# Keterjangkauan hanya bermakna untuk jaringan gender; jaringan umum
+# (gender tidak diset) tidak memiliki aturan gejala -> penyakit
+GENDER_NETWORKS = ('pria', 'wanita')
+
+
+def dependency_graph(network: RuleNetwork) -> Dict[str, Set[str]]:
+    """
+    Graf dependensi antar kode: premis -> kesimpulan untuk setiap aturan
+    """
+    graph: Dict[str, Set[str]] = {}
+    for rule in network.rules:
+        for kode in rule.premis:
+            graph.setdefault(kode, set()).add(rule.maka)
+    return graph
+
+
+def find_cycles(graph: Dict[str, Set[str]]) -> List[List[str]]:
+    """
+    Komponen terhubung kuat (Tarjan, iteratif) yang membentuk siklus:
+    lebih dari satu kode, atau satu kode yang bergantung pada dirinya sendiri
+    """
+    index: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    cycles = []
+    for start in sorted(graph):
+        if start in index:
+            continue
+        work = [(start, iter(sorted(graph.get(start, ()))))]
+        index[start] = lowlink[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(sorted(graph.get(successor, ())))))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        kode = stack.pop()
+                        on_stack.discard(kode)
+                        component.append(kode)
+                        if kode == node:
+                            break
+                    if len(component) > 1 or node in graph.get(node, ()):
+                        cycles.append(sorted(component))
+    return sorted(cycles)
+
+
+def derivable_codes(kb: KnowledgeBase, network: RuleNetwork) -> Set[str]:
+    """
+    Kode yang dapat bernilai positif pada jaringan ini: gejala dengan CF
+    pakar bukan 0, dan kesimpulan aturan yang dapat menyala (semua premis
+    dapat positif dan cf_rule > 0). Dihitung sebagai titik tetap dengan
+    penghitung premis yang sama seperti inferensi.
+    """
+    missing = list(network.premise_counts)
+    ready: List[int] = []
+    derived = set()
+
+    def derive(kode: str):
+        if kode in derived:
+            return
+        derived.add(kode)
+        for i in network.index.get(kode, ()):
+            missing[i] -= 1
+            if missing[i] == 0:
+                ready.append(i)
+
+    for kode, gejala in kb.indexes['gejala'].items():
+        if gejala.get('cf_pakar', 0.0) != 0:
+            derive(kode)
+    while ready:
+        rule = network.rules[ready.pop()]
+        if rule.cf_rule > 0:
+            derive(rule.maka)
+    return derived
+
+
+def unsatisfiable_rules(kb: KnowledgeBase, network: RuleNetwork, derived: Set[str]) -> List[Dict]:
+    """
+    Aturan yang tidak pernah dapat menyala pada jaringan ini, beserta alasannya
+    """
+    gejala = kb.indexes['gejala']
+    result = []
+    for rule in network.rules:
+        reasons = []
+        if not rule.premis:
+            reasons.append("aturan tanpa premis")
+        if rule.cf_rule <= 0:
+            reasons.append(f"cf_rule {rule.cf_rule} tidak positif")
+        for kode in rule.premis:
+            if kode in derived:
+                continue
+            if kode in gejala:
+                reasons.append(f"gejala {kode} memiliki CF pakar 0")
+            elif kode in network.producers:
+                reasons.append(f"{kode} tidak dapat disimpulkan")
+            else:
+                reasons.append(f"tidak ada aturan yang menghasilkan {kode}")
+        if reasons:
+            result.append({'aturan': rule.id, 'alasan': reasons})
+    return result
+
+
+def unknown_codes(kb: KnowledgeBase) -> List[Dict]:
+    """
+    Kode pada aturan yang tidak terdaftar: premis yang tidak ada di tabel
+    gejala/penyakit/komplikasi dan kesimpulan yang tidak ada di tabel
+    penyakit/komplikasi
+    """
+    indexes = kb.indexes
+    known = set(indexes['gejala']) | set(indexes['penyakit']) | set(indexes['komplikasi'])
+    conclusions = set(indexes['penyakit']) | set(indexes['komplikasi'])
+    result = []
+    for section in ('aturan_pria', 'aturan_wanita', 'aturan'):
+        for rule in kb.data.get(section, []):
+            for kode in dict.fromkeys(rule.get('jika', [])):
+                if kode not in known:
+                    result.append({'aturan': rule.get('id'), 'bagian': section, 'posisi': 'jika', 'kode': kode})
+            if rule.get('maka') not in conclusions:
+                result.append({'aturan': rule.get('id'), 'bagian': section, 'posisi': 'maka',
+                               'kode': rule.get('maka')})
+    return result
+
+
+def analyze(kb: KnowledgeBase) -> Dict:
+    """
+    Analisis statis basis pengetahuan. Graf dependensi setiap jaringan
+    aturan dibangun sekali, lalu dilaporkan: kode yang tidak terdaftar
+    (error), aturan yang tidak pernah dapat menyala dan kesimpulan yang
+    tidak terjangkau per gender, siklus antar kesimpulan turunan, serta
+    strata (urutan evaluasi bertingkat) yang dipakai engine.
+    """
+    report = {
+        'versi': kb.version,
+        'kode_tidak_dikenal': unknown_codes(kb),
+        'jaringan': {},
+    }
+    declared = list(kb.indexes['penyakit']) + list(kb.indexes['komplikasi'])
+    unreachable_everywhere = set(declared)
+    for key, name in NETWORKS:
+        network = kb.rule_networks[key]
+        info = {
+            'aturan': len(network.rules),
+            'asiklik': network.acyclic,
+            'siklus': find_cycles(dependency_graph(network)),
+            'strata': [[network.rules[i].id for i in stratum] for stratum in network.strata],
+        }
+        if name in GENDER_NETWORKS:
+            derived = derivable_codes(kb, network)
+            info['aturan_tak_terpenuhi'] = unsatisfiable_rules(kb, network, derived)
+            info['kesimpulan_tak_terjangkau'] = [kode for kode in declared if kode not in derived]
+            unreachable_everywhere &= set(info['kesimpulan_tak_terjangkau'])
+        report['jaringan'][name] = info
+    report['kesimpulan_tak_terjangkau'] = [kode for kode in declared if kode in unreachable_everywhere]
+    report['jumlah_error'] = len(report['kode_tidak_dikenal'])
+    report['jumlah_peringatan'] = (
+        len(report['kesimpulan_tak_terjangkau'])
+        + sum(len(report['jaringan'][name]['aturan_tak_terpenuhi']) for name in GENDER_NETWORKS)
+        + len({tuple(cycle) for info in report['jaringan'].values() for cycle in info['siklus']})
+    )
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """
+    Laporan analisis dalam bentuk teks
+    """
+    lines = [f"ANALISIS BASIS PENGETAHUAN (versi {report['versi']})", "=" * 50]
+    lines.append(f"Error: {report['jumlah_error']}, peringatan: {report['jumlah_peringatan']}")
+
+    lines.append("\nKode tidak terdaftar:")
+    for item in report['kode_tidak_dikenal']:
+        lines.append(f"- {item['aturan']} ({item['bagian']}, {item['posisi']}): {item['kode']}")
+    if not report['kode_tidak_dikenal']:
+        lines.append("- tidak ada")
+
+    lines.append("\nKesimpulan yang tidak dapat dicapai untuk gender mana pun:")
+    lines.append(f"- {', '.join(report['kesimpulan_tak_terjangkau']) or 'tidak ada'}")
+
+    for name, info in report['jaringan'].items():
+        lines.append(f"\nJaringan {name}: {info['aturan']} aturan, "
+                     f"{'asiklik' if info['asiklik'] else 'BERSIKLUS'}")
+        lines.append(f"  Strata: {len(info['strata'])} tingkat "
+                     f"({', '.join(str(len(stratum)) for stratum in info['strata'])} aturan)")
+        for cycle in info['siklus']:
+            lines.append(f"  Siklus: {' <-> '.join(cycle)}")
+        if name not in GENDER_NETWORKS:
+            continue
+        if info['kesimpulan_tak_terjangkau']:
+            lines.append(f"  Kesimpulan tak terjangkau: {', '.join(info['kesimpulan_tak_terjangkau'])}")
+        for item in info['aturan_tak_terpenuhi']:
+            lines.append(f"  Aturan {item['aturan']} tidak pernah menyala: {'; '.join(item['alasan'])}")
+    return '\n'.join(lines)
+
+
+def main():
+    """
+    Fungsi utama untuk menganalisis rules.json
+    """
+    parser = argparse.ArgumentParser(description="Analisis statis basis pengetahuan (rules.json)")
+    parser.add_argument('--rules', default='rules.json', help="file basis pengetahuan")
+    parser.add_argument('--json', action='store_true', help="cetak laporan dalam format JSON")
+    parser.add_argument('--strict', action='store_true', help="peringatan juga dianggap gagal (exit code 1)")
+    args = parser.parse_args()
+
+    kb = KnowledgeBase.load(args.rules, use_compiled=False)
+    if not kb.data:
+        sys.exit(1)
+    try:
+        report = analyze(kb)
+    except (KeyError, TypeError, AttributeError) as exc:
+        print(f"Basis pengetahuan tidak dapat dianalisis: {exc}")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(format_report(report))
+    if report['jumlah_error'] or (args.strict and report['jumlah_peringatan']):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
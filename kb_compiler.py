@@ -0,0 +1,534 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from engine import KnowledgeBase, Rule, RuleNetwork, validate_knowledge_base
+
+MAGIC = b'DXKB'
+FORMAT_VERSION = 2
+# magic, versi format, panjang direktori JSON
+HEADER = struct.Struct('<4sII')
+ALIGNMENT = 8
+
+ENTITY_SECTIONS = ('gejala', 'penyakit', 'komplikasi')
+RULE_SECTIONS = ('aturan_pria', 'aturan_wanita', 'aturan')
+# Kunci jaringan aturan di KnowledgeBase.rule_networks -> nama di artefak
+NETWORKS = (('pria', 'pria'), ('wanita', 'wanita'), (None, 'umum'))
+
+# Field yang didukung per record; record dengan field lain tidak dikompilasi
+ENTITY_FIELDS = {'gejala': {'kode', 'nama', 'cf_pakar'}, 'penyakit': {'kode', 'nama'},
+                 'komplikasi': {'kode', 'nama'}}
+RULE_FIELDS = {'id', 'jika', 'maka', 'cf_rule'}
+
+
+def compiled_path(rules_file: str) -> str:
+    """
+    Lokasi default artefak biner untuk satu file rules.json (rules.kbc)
+    """
+    return os.path.splitext(rules_file)[0] + '.kbc'
+
+
+class SymbolTable:
+    """
+    Tabel simbol: setiap string (kode, nama, id aturan) disimpan sekali
+    dan dirujuk dengan ID bilangan bulat
+    """
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, text: str) -> int:
+        sym = self.ids.get(text)
+        if sym is None:
+            sym = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return sym
+
+    def encode(self) -> Tuple[array, bytes]:
+        offsets = array('I', [0])
+        blob = bytearray()
+        for text in self.strings:
+            blob += text.encode('utf-8')
+            offsets.append(len(blob))
+        return offsets, bytes(blob)
+
+
+def _check_fields(section: str, record: Dict, fields: set):
+    if not isinstance(record, dict) or set(record) != fields:
+        raise ValueError(f"Record {section} {record!r} tidak sesuai skema {sorted(fields)}")
+
+
+def compile_knowledge_base(kb: KnowledgeBase) -> bytes:
+    """
+    Mengompilasi basis pengetahuan menjadi artefak biner: tabel simbol,
+    array kode/nama/CF per bagian, array premis per himpunan aturan, dan
+    untuk setiap jaringan aturan seluruh struktur yang dipakai inferensi
+    (premis dalam ID simbol engine, indeks premis -> aturan, urutan
+    topologis, rank, jumlah premis dan akar). CF disimpan sebagai double
+    sehingga hasil inferensi identik dengan file JSON.
+    """
+    data = kb.data
+    # Artefak dimuat tanpa validasi ulang (load_shared_knowledge_base),
+    # sehingga hanya basis pengetahuan yang valid yang dikompilasi
+    errors = validate_knowledge_base(data)
+    if errors:
+        raise ValueError('; '.join(errors))
+    symbols = SymbolTable()
+    sections: Dict[str, array] = {}
+
+    for section in ENTITY_SECTIONS:
+        items = data.get(section, [])
+        for item in items:
+            _check_fields(section, item, ENTITY_FIELDS[section])
+        sections[f'{section}.kode'] = array('I', (symbols.intern(item['kode']) for item in items))
+        sections[f'{section}.nama'] = array('I', (symbols.intern(item['nama']) for item in items))
+    sections['gejala.cf_pakar'] = array('d', (item['cf_pakar'] for item in data.get('gejala', [])))
+
+    for section in RULE_SECTIONS:
+        rules = data.get(section, [])
+        premis = array('I')
+        premis_offset = array('I', [0])
+        for rule in rules:
+            _check_fields(section, rule, RULE_FIELDS)
+            premis.extend(symbols.intern(kode) for kode in rule['jika'])
+            premis_offset.append(len(premis))
+        sections[f'{section}.id'] = array('I', (symbols.intern(rule['id']) for rule in rules))
+        sections[f'{section}.maka'] = array('I', (symbols.intern(rule['maka']) for rule in rules))
+        sections[f'{section}.cf_rule'] = array('d', (rule['cf_rule'] for rule in rules))
+        sections[f'{section}.premis_offset'] = premis_offset
+        sections[f'{section}.premis'] = premis
+
+    extra = set(data) - set(ENTITY_SECTIONS) - set(RULE_SECTIONS)
+    if extra:
+        raise ValueError(f"Bagian basis pengetahuan tidak didukung: {sorted(extra)}")
+
+    # Simbol engine (KnowledgeBase.symbols) beserta CF pakar; NaN berarti bukan gejala
+    sections['simbol.kode'] = array('I', (symbols.intern(kode) for kode in kb.symbols))
+    sections['simbol.cf_pakar'] = array('d', (float('nan') if cf is None else cf for cf in kb.gejala_cf))
+
+    acyclic = {}
+    for key, name in NETWORKS:
+        network = kb.rule_networks[key]
+        prefix = f'jaringan.{name}.'
+        rules = network.rules
+        sections[prefix + 'id'] = array('I', (symbols.intern(rule.id) for rule in rules))
+        sections[prefix + 'maka'] = array('I', (rule.maka_id for rule in rules))
+        sections[prefix + 'cf_rule'] = array('d', (rule.cf_rule for rule in rules))
+        for field, values in (('jika', [[kb.symbol_ids[kode] for kode in rule.jika] for rule in rules]),
+                              ('premis', [rule.premis_id for rule in rules])):
+            flat = array('I')
+            offset = array('I', [0])
+            for ids in values:
+                flat.extend(ids)
+                offset.append(len(flat))
+            sections[prefix + field] = flat
+            sections[prefix + field + '_offset'] = offset
+        indeks = array('I')
+        indeks_offset = array('I', [0])
+        for ids in network.index_ids:
+            indeks.extend(ids)
+            indeks_offset.append(len(indeks))
+        sections[prefix + 'indeks'] = indeks
+        sections[prefix + 'indeks_offset'] = indeks_offset
+        sections[prefix + 'order'] = array('I', network.order)
+        sections[prefix + 'rank'] = array('I', network.rank)
+        sections[prefix + 'jumlah_premis'] = array('I', network.premise_counts)
+        sections[prefix + 'akar'] = array('I', network.roots)
+        acyclic[name] = network.acyclic
+
+    offsets, blob = symbols.encode()
+    sections['simbol.offset'] = offsets
+    sections['simbol.data'] = array('B', blob)
+
+    source = {}
+    if kb.source_stat is not None:
+        source = {'mtime_ns': kb.source_stat[0], 'size': kb.source_stat[1]}
+    directory = {
+        'versi': kb.version,
+        'sumber': source,
+        'byteorder': sys.byteorder,
+        'bagian_ada': [section for section in ENTITY_SECTIONS + RULE_SECTIONS if section in data],
+        'asiklik': acyclic,
+        'bagian': {},
+    }
+    # Offset setiap bagian dihitung relatif terhadap awal data (setelah direktori)
+    position = 0
+    for name, values in sections.items():
+        directory['bagian'][name] = [position, len(values), values.typecode]
+        position += _aligned(len(values) * values.itemsize)
+
+    encoded = json.dumps(directory).encode('utf-8')
+    encoded += b' ' * (_aligned(HEADER.size + len(encoded)) - HEADER.size - len(encoded))
+    output = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+    output += encoded
+    for values in sections.values():
+        raw = values.tobytes()
+        output += raw + b'\0' * (_aligned(len(raw)) - len(raw))
+    return bytes(output)
+
+
+def _aligned(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_compiled(kb: KnowledgeBase, path: str) -> int:
+    """
+    Menulis artefak secara atomik (file sementara lalu os.replace), sehingga
+    proses yang sedang me-mmap artefak lama tidak terganggu
+    """
+    payload = compile_knowledge_base(kb)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(payload)
+    os.replace(temp_path, path)
+    return len(payload)
+
+
+class CompiledKnowledgeBase:
+    """
+    Tampilan read-only atas artefak biner yang di-mmap. Array-nya adalah
+    memoryview ke halaman file (tanpa salinan), sehingga proses worker yang
+    memuat artefak yang sama berbagi halaman tersebut lewat page cache
+    sistem operasi. String tabel simbol didekode satu per satu saat dibutuhkan.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mmap)
+        magic, format_version, length = HEADER.unpack_from(view)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"{path} bukan artefak basis pengetahuan versi {FORMAT_VERSION}")
+        self.directory = json.loads(bytes(view[HEADER.size:HEADER.size + length]).decode('utf-8'))
+        if self.directory['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} dibuat dengan byte order {self.directory['byteorder']}")
+        self.version = self.directory['versi']
+        base = HEADER.size + length
+        self.sections = {}
+        for name, (offset, count, typecode) in self.directory['bagian'].items():
+            itemsize = array(typecode).itemsize
+            start = base + offset
+            self.sections[name] = view[start:start + count * itemsize].cast(typecode)
+        self._strings = None
+
+    def string(self, sym: int) -> str:
+        """
+        Satu string tabel simbol, didekode langsung dari artefak
+        """
+        offsets = self.sections['simbol.offset']
+        return str(self.sections['simbol.data'][offsets[sym]:offsets[sym + 1]], 'utf-8')
+
+    @property
+    def strings(self) -> List[str]:
+        """
+        Seluruh tabel simbol, didekode sekali saat pertama dibutuhkan
+        """
+        if self._strings is None:
+            offsets = self.sections['simbol.offset']
+            blob = bytes(self.sections['simbol.data'])
+            self._strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+                             for i in range(len(offsets) - 1)]
+        return self._strings
+
+    def is_fresh(self, rules_file: str) -> bool:
+        """
+        Artefak masih berlaku jika file sumber tidak berubah: mtime dan
+        ukuran sama, atau isi file (sha256) sama dengan versi artefak
+        """
+        source = self.directory['sumber']
+        try:
+            stat = os.stat(rules_file)
+        except OSError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == (source.get('mtime_ns'), source.get('size')):
+            return True
+        with open(rules_file, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()[:16] == self.version
+
+    def to_data(self) -> Dict:
+        """
+        Merekonstruksi isi rules.json (struktur dict/list yang sama)
+        """
+        strings = self.strings
+        sections = self.sections
+        present = set(self.directory['bagian_ada'])
+        data = {}
+        for section in ENTITY_SECTIONS:
+            if section not in present:
+                continue
+            kode = sections[f'{section}.kode']
+            nama = sections[f'{section}.nama']
+            if section == 'gejala':
+                cf_pakar = sections['gejala.cf_pakar']
+                data[section] = [{'kode': strings[kode[i]], 'nama': strings[nama[i]], 'cf_pakar': cf_pakar[i]}
+                                 for i in range(len(kode))]
+            else:
+                data[section] = [{'kode': strings[kode[i]], 'nama': strings[nama[i]]}
+                                 for i in range(len(kode))]
+        for section in RULE_SECTIONS:
+            if section not in present:
+                continue
+            rule_id = sections[f'{section}.id']
+            maka = sections[f'{section}.maka']
+            cf_rule = sections[f'{section}.cf_rule']
+            offset = sections[f'{section}.premis_offset']
+            premis = sections[f'{section}.premis']
+            data[section] = [
+                {'id': strings[rule_id[i]],
+                 'jika': [strings[sym] for sym in premis[offset[i]:offset[i + 1]]],
+                 'maka': strings[maka[i]],
+                 'cf_rule': cf_rule[i]}
+                for i in range(len(rule_id))
+            ]
+        return data
+
+
+class _LazySequence(dict):
+    """
+    Barisan read-only berpanjang tetap yang elemennya dibangun dari
+    artefak saat pertama diakses lalu disimpan. Turunan dict dengan
+    __missing__, sehingga akses elemen yang sudah dibangun tetap secepat
+    lookup dict biasa di jalur inferensi.
+    """
+    def __init__(self, length: int, build: Callable[[int], object]):
+        super().__init__()
+        self._length = length
+        self._build = build
+
+    def __missing__(self, i: int):
+        if not isinstance(i, int):
+            raise TypeError(f"indeks harus int, bukan {type(i).__name__}")
+        if i < 0:
+            return self[i + self._length]
+        if i >= self._length:
+            raise IndexError(i)
+        value = self[i] = self._build(i)
+        return value
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator:
+        return (self[i] for i in range(self._length))
+
+
+class MappedSection(Mapping):
+    """
+    Indeks kode -> data (dict seperti pada rules.json) untuk satu bagian
+    gejala/penyakit/komplikasi, dibaca dari array artefak. Kode didekode
+    saat indeks pertama kali dipakai; nama hanya saat datanya diminta.
+    """
+    def __init__(self, compiled: CompiledKnowledgeBase, section: str):
+        self._compiled = compiled
+        sections = compiled.sections
+        self._kode = sections[f'{section}.kode']
+        self._nama = sections[f'{section}.nama']
+        self._cf_pakar = sections['gejala.cf_pakar'] if section == 'gejala' else None
+        self._rows = None
+        self._items = {}
+
+    @property
+    def rows(self) -> Dict[str, int]:
+        if self._rows is None:
+            rows = {}
+            for i, sym in enumerate(self._kode):
+                # Data pertama menang, sama seperti KnowledgeBase.build_indexes
+                rows.setdefault(self._compiled.string(sym), i)
+            self._rows = rows
+        return self._rows
+
+    def __getitem__(self, kode: str) -> Dict:
+        item = self._items.get(kode)
+        if item is None:
+            i = self.rows[kode]
+            item = {'kode': kode, 'nama': self._compiled.string(self._nama[i])}
+            if self._cf_pakar is not None:
+                item['cf_pakar'] = self._cf_pakar[i]
+            self._items[kode] = item
+        return item
+
+    def __contains__(self, kode) -> bool:
+        return kode in self.rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class MappedRuleNetwork(RuleNetwork):
+    """
+    RuleNetwork yang dibaca langsung dari array artefak. order dan rank
+    adalah memoryview ke file; objek Rule dan daftar aturan
+    per premis dibangun per aturan/simbol saat pertama dipakai, sehingga
+    biaya memuat tidak bergantung pada jumlah aturan. Indeks berkunci kode
+    (index, producers, premises) dibangun utuh saat pertama diminta.
+    """
+    def __init__(self, compiled: CompiledKnowledgeBase, name: str, symbols: Tuple[str, ...]):
+        sections = compiled.sections
+        prefix = f'jaringan.{name}.'
+        self._compiled = compiled
+        self._symbols = symbols
+        self._id = sections[prefix + 'id']
+        self._maka = sections[prefix + 'maka']
+        self._cf_rule = sections[prefix + 'cf_rule']
+        self._jika = sections[prefix + 'jika']
+        self._jika_offset = sections[prefix + 'jika_offset']
+        self._premis = sections[prefix + 'premis']
+        self._premis_offset = sections[prefix + 'premis_offset']
+        indeks = sections[prefix + 'indeks']
+        indeks_offset = sections[prefix + 'indeks_offset']
+        n_rules = len(self._id)
+
+        self.rules = _LazySequence(n_rules, self._build_rule)
+        self.index_ids = _LazySequence(
+            len(symbols), lambda sym: tuple(indeks[indeks_offset[sym]:indeks_offset[sym + 1]]))
+        self.order = sections[prefix + 'order']
+        self.rank = sections[prefix + 'rank']
+        # Disalin ke tuple: infer() menyalinnya ke list setiap diagnosa, dan
+        # list(tuple) jauh lebih cepat daripada dari memoryview. Isinya int
+        # kecil yang di-cache Python, sehingga tidak ada objek per aturan.
+        self.premise_counts = tuple(sections[prefix + 'jumlah_premis'])
+        self.roots = tuple(sections[prefix + 'akar'])
+        self.acyclic = compiled.directory['asiklik'][name]
+        self._index = None
+        self._producers = None
+        self._premises = None
+        self._strata = None
+
+    def _build_rule(self, i: int) -> Rule:
+        symbols = self._symbols
+        jika = tuple(symbols[sym] for sym in self._jika[self._jika_offset[i]:self._jika_offset[i + 1]])
+        premis_id = tuple(self._premis[self._premis_offset[i]:self._premis_offset[i + 1]])
+        maka_id = self._maka[i]
+        return Rule.from_fields(self._compiled.string(self._id[i]), jika, symbols[maka_id],
+                                self._cf_rule[i], premis_id, maka_id)
+
+    @property
+    def premises(self) -> Tuple[Tuple[str, ...], ...]:
+        if self._premises is None:
+            symbols = self._symbols
+            premis, offset = self._premis, self._premis_offset
+            self._premises = tuple(tuple(symbols[sym] for sym in premis[offset[i]:offset[i + 1]])
+                                   for i in range(len(self.rules)))
+        return self._premises
+
+    @property
+    def index(self) -> Mapping:
+        if self._index is None:
+            self._index = MappingProxyType({
+                self._symbols[sym]: ids for sym, ids in enumerate(self.index_ids) if ids
+            })
+        return self._index
+
+    @property
+    def producers(self) -> Mapping:
+        if self._producers is None:
+            producers: Dict[str, List[int]] = {}
+            symbols = self._symbols
+            for i, sym in enumerate(self._maka):
+                producers.setdefault(symbols[sym], []).append(i)
+            self._producers = MappingProxyType({kode: tuple(ids) for kode, ids in producers.items()})
+        return self._producers
+
+
+class MappedKnowledgeBase(KnowledgeBase):
+    """
+    KnowledgeBase yang struktur inferensinya dibaca langsung dari artefak
+    biner yang di-mmap: tabel simbol engine, CF pakar dan jaringan aturan
+    (MappedRuleNetwork). Hanya kode simbol yang didekode saat memuat; nama,
+    objek Rule dan `data` (isi rules.json) dibangun saat pertama dibutuhkan.
+    """
+    def __init__(self, compiled: CompiledKnowledgeBase, rules_file: str = None,
+                 source_stat: Tuple = None):
+        self._data = None
+        super().__init__(None, rules_file, compiled.version, source_stat, compiled)
+
+    @property
+    def data(self) -> Dict:
+        if self._data is None:
+            self._data = self.compiled.to_data()
+        return self._data
+
+    @data.setter
+    def data(self, value: Dict):
+        self._data = value
+
+    def build_indexes(self, data: Dict) -> Dict:
+        return MappingProxyType({section: MappedSection(self.compiled, section)
+                                 for section in ENTITY_SECTIONS})
+
+    def build_symbols(self, data: Dict):
+        sections = self.compiled.sections
+        string = self.compiled.string
+        self.symbols = tuple(string(sym) for sym in sections['simbol.kode'])
+        self.symbol_ids = MappingProxyType({kode: i for i, kode in enumerate(self.symbols)})
+        self.gejala_cf = tuple(None if cf != cf else cf for cf in sections['simbol.cf_pakar'])
+
+    def compile_rule_networks(self, data: Dict) -> Dict:
+        return MappingProxyType({
+            key: MappedRuleNetwork(self.compiled, name, self.symbols) for key, name in NETWORKS
+        })
+
+
+def load_compiled(rules_file: str, path: str = None) -> Optional[KnowledgeBase]:
+    """
+    Memuat KnowledgeBase dari artefak biner jika ada dan masih sesuai
+    dengan rules_file. Mengembalikan None jika artefak tidak ada, rusak
+    atau usang, sehingga pemanggil kembali memuat file JSON.
+    """
+    path = path or compiled_path(rules_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        compiled = CompiledKnowledgeBase(path)
+        if not compiled.is_fresh(rules_file):
+            return None
+        stat = os.stat(rules_file)
+        return MappedKnowledgeBase(compiled, rules_file, (stat.st_mtime_ns, stat.st_size))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def main():
+    """
+    Fungsi utama untuk mengompilasi rules.json menjadi artefak biner
+    """
+    parser = argparse.ArgumentParser(description="Kompilasi basis pengetahuan ke format biner (mmap)")
+    parser.add_argument('--rules', default='rules.json', help="file basis pengetahuan")
+    parser.add_argument('--output', '-o', default=None, help="file artefak, default <rules>.kbc")
+    args = parser.parse_args()
+
+    output = args.output or compiled_path(args.rules)
+    start = time.perf_counter()
+    kb = KnowledgeBase.load(args.rules, use_compiled=False)
+    json_time = time.perf_counter() - start
+    if not kb.data:
+        sys.exit(1)
+    try:
+        size = write_compiled(kb, output)
+    except ValueError as exc:
+        print(f"Basis pengetahuan tidak dapat dikompilasi: {exc}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    compiled = load_compiled(args.rules, output)
+    compiled_time = time.perf_counter() - start
+    print(f"Artefak ditulis ke {output} ({size / 1024:.1f} KiB, versi {kb.version})")
+    print(f"- muat dari JSON: {json_time:.3f} detik")
+    if compiled is not None:
+        print(f"- muat dari artefak: {compiled_time:.3f} detik")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+
+from batch_runner import _diagnose_chunk, _init_worker, validate_record
+from engine import DiagnosisCache, KnowledgeBaseWatcher, Provenance, RuleProfiler, infer
+
+# Batas atas bucket histogram latensi (detik)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_BODY_SIZE = 16 * 1024 * 1024
+ENDPOINTS = ('/health', '/metrics', '/diagnosa', '/diagnosa/batch')
+# Ukuran minimum chunk batch per tugas worker; chunk lebih kecil lebih mahal
+# biaya kirim antarprosesnya daripada inferensinya
+MIN_CHUNK_SIZE = 64
+
+HTTP_STATUS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class LatencyHistogram:
+    """
+    Histogram latensi kumulatif dengan format Prometheus
+    """
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class QueueFull(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class DiagnosisService:
+    """
+    Layanan HTTP/JSON asyncio untuk diagnosa tunggal dan batch.
+    Satu basis pengetahuan terkompilasi dipakai bersama, batch dikerjakan
+    di process pool, dan antrean terbatas memberi backpressure (HTTP 503).
+    Dengan profile=True, statistik per aturan dari diagnosa tunggal
+    ditambahkan ke /metrics. Jika reload_interval diberikan, perubahan
+    rules.json dimuat ulang tanpa restart (KnowledgeBaseWatcher) dan setiap
+    hasil ditandai dengan versi basis pengetahuan yang menghitungnya.
+    """
+    def __init__(self, rules_file: str = "rules.json", workers: int = None,
+                 queue_size: int = 1000, concurrency: int = 8, profile: bool = False,
+                 reload_interval: float = None):
+        self.rules_file = rules_file
+        self.watcher = KnowledgeBaseWatcher(rules_file, reload_interval or 1.0, self._on_swap)
+        self.reload_interval = reload_interval
+        self.cache = DiagnosisCache()
+        self.profiler = RuleProfiler() if profile else None
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.responses: Dict[Tuple[str, int], int] = {}
+        self.rejected = 0
+        self.queue = None
+        self.pool = None
+        # Versi basis pengetahuan yang dimuat oleh worker pool saat ini
+        self.pool_version = None
+        self._loop = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def kb(self):
+        """
+        Basis pengetahuan terbaru; penukaran saat hot reload bersifat atomik
+        """
+        return self.watcher.current
+
+    async def start(self, host: str, port: int):
+        """
+        Menjalankan server dan worker antrean
+        """
+        self._loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.queue_size)
+        self._replace_pool(self.kb)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+        if self.reload_interval:
+            self.watcher.start()
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def stop(self):
+        self.watcher.stop()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def _on_swap(self, old, new):
+        """
+        Dipanggil dari thread pemantau setelah basis pengetahuan ditukar;
+        pool diganti di thread event loop
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._replace_pool, new)
+
+    def _replace_pool(self, kb):
+        """
+        Membuat process pool baru yang memuat basis pengetahuan terbaru
+        (isi yang sudah divalidasi dikirim ke worker, bukan dibaca ulang dari file;
+        basis pengetahuan dari artefak biner cukup dikirim path artefaknya).
+        Batch yang sudah dikirim ke pool lama tetap diselesaikan di sana
+        (shutdown tanpa menunggu dan tanpa membatalkan pekerjaan).
+        """
+        old = self.pool
+        # Thread pemantau dapat sedang memegang lock basis pengetahuan;
+        # worker hasil fork akan mewarisinya, sehingga dipakai forkserver/spawn
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                        initializer=_init_worker,
+                                        initargs=self._worker_args(kb))
+        self.pool_version = kb.version
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def _worker_args(self, kb) -> Tuple:
+        """
+        Argumen _init_worker untuk basis pengetahuan kb
+        """
+        if kb.compiled is not None:
+            return self.rules_file, None, kb.version, kb.compiled.path
+        return self.rules_file, kb.data, kb.version
+
+    async def _worker(self):
+        """
+        Mengambil pekerjaan dari antrean; batch dibagi ke seluruh worker
+        process pool. Diagnosa tunggal dijalankan langsung di thread event
+        loop: infer pada basis pengetahuan seukuran rules.json lebih murah
+        daripada berpindah thread/proses, dan profiler tidak perlu dikunci.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            kind, payload, future = await self.queue.get()
+            try:
+                if kind == 'batch':
+                    # Pool dan versinya diambil bersamaan; hot reload berikutnya
+                    # tidak mengubah pool yang sedang mengerjakan batch ini
+                    pool, version = self.pool, self.pool_version
+                    try:
+                        size = max(MIN_CHUNK_SIZE, -(-len(payload) // self.workers))
+                        chunks = await asyncio.gather(*(
+                            loop.run_in_executor(pool, _diagnose_chunk, payload[i:i + size])
+                            for i in range(0, len(payload), size)
+                        ))
+                    except BrokenProcessPool:
+                        # Worker mati (mis. OOM): pool diganti agar batch berikutnya berjalan
+                        if pool is self.pool:
+                            self._replace_pool(self.kb)
+                        raise
+                    result = {'versi_kb': version, 'hasil': [item for chunk in chunks for item in chunk]}
+                else:
+                    result = self.diagnose_single(payload)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            finally:
+                self.queue.task_done()
+
+    async def submit(self, kind: str, payload):
+        """
+        Memasukkan pekerjaan ke antrean; menolak jika antrean penuh
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((kind, payload, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull()
+        return await future
+
+    def diagnose_single(self, record: Dict) -> Dict:
+        """
+        Diagnosa satu pasien dengan cache hasil. Record bertanda 'jelaskan'
+        selalu diinferensi ulang agar DAG asal-usulnya dapat disertakan.
+        Basis pengetahuan diambil sekali, sehingga hasil dan tanda versinya
+        konsisten walaupun terjadi hot reload.
+        """
+        kb = self.kb
+        provenance = Provenance() if record.get('jelaskan') else None
+        conclusions = None if provenance else self.cache.get(kb, record['gender'], record['facts'])
+        if conclusions is None:
+            conclusions = infer(kb, record['gender'], record['facts'], profiler=self.profiler,
+                                provenance=provenance)
+            self.cache.put(kb, record['gender'], record['facts'], conclusions)
+        result = {
+            'id': record.get('id'),
+            'gender': record['gender'],
+            'versi_kb': kb.version,
+            'hasil': [
+                {'kode': kode, 'nama': nama, 'cf': cf}
+                for kode, nama, cf in kb.diagnosis_results(conclusions)
+            ],
+        }
+        if provenance is not None:
+            result['provenance'] = provenance.to_dict()
+        return result
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Melayani satu koneksi HTTP/1.1 (mendukung keep-alive)
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    await self._respond(writer, path, 400, {'error': "Content-Length tidak valid"}, time.perf_counter())
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, path, 413, {'error': "Body terlalu besar"}, time.perf_counter())
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                start = time.perf_counter()
+                status, payload = await self.route(method, path.split('?', 1)[0], body)
+                await self._respond(writer, path, status, payload, start)
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes):
+        """
+        Meneruskan request ke handler endpoint
+        """
+        routes = {
+            '/health': ('GET', self.handle_health),
+            '/metrics': ('GET', self.handle_metrics),
+            '/diagnosa': ('POST', self.handle_diagnosa),
+            '/diagnosa/batch': ('POST', self.handle_batch),
+        }
+        if path not in ENDPOINTS:
+            return 404, {'error': "Endpoint tidak ditemukan"}
+        expected_method, handler = routes[path]
+        if method != expected_method:
+            return 405, {'error': f"Gunakan method {expected_method}"}
+        try:
+            return 200, await handler(body)
+        except HTTPError as exc:
+            return exc.status, {'error': exc.message}
+        except QueueFull:
+            return 503, {'error': "Server sibuk, antrean penuh"}
+        except BrokenProcessPool:
+            return 500, {'error': "Worker batch berhenti tak terduga, coba lagi"}
+        except Exception:
+            # Balasan JSON tetap dikirim (dan tercatat di metrik) walaupun
+            # handler gagal karena bug
+            traceback.print_exc()
+            return 500, {'error': "Kesalahan internal server"}
+
+    async def handle_health(self, body: bytes):
+        return {
+            'status': 'ok',
+            'versi_kb': self.kb.version,
+            'reload': {'berhasil': self.watcher.swaps, 'gagal': self.watcher.failures,
+                       'error_terakhir': self.watcher.last_error},
+        }
+
+    async def handle_metrics(self, body: bytes):
+        return self.render_metrics()
+
+    async def handle_diagnosa(self, body: bytes):
+        record = self._parse_record(self._parse_json(body))
+        return await self.submit('single', record)
+
+    async def handle_batch(self, body: bytes):
+        payload = self._parse_json(body)
+        pasien = payload.get('pasien') if isinstance(payload, dict) else None
+        if not isinstance(pasien, list):
+            raise HTTPError(400, "Field 'pasien' harus berupa list")
+        try:
+            kb = self.kb
+            records = [validate_record(kb, raw, i) for i, raw in enumerate(pasien, 1)]
+        except (TypeError, ValueError, AttributeError) as exc:
+            raise HTTPError(400, f"Data pasien tidak valid: {exc}")
+        return await self.submit('batch', records)
+
+    def _parse_json(self, body: bytes):
+        try:
+            return json.loads(body.decode('utf-8') or 'null')
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HTTPError(400, "Body bukan JSON yang valid")
+
+    def _parse_record(self, payload) -> Dict:
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body harus berupa objek JSON")
+        try:
+            # Validator yang sama dengan batch: kode gejala dikenal dan CF
+            # berhingga di [-1, 1] (NaN juga akan membuat cache selalu miss)
+            record = validate_record(self.kb, payload, None)
+        except (TypeError, ValueError, AttributeError) as exc:
+            raise HTTPError(400, f"Data pasien tidak valid: {exc}")
+        if 'error' in record:
+            raise HTTPError(400, record['error'])
+        return record
+
+    async def _respond(self, writer: asyncio.StreamWriter, path: str, status: int, payload, start: float):
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4'
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json'
+        head = (f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode('latin-1') + b"\r\n" + body)
+        await writer.drain()
+
+        endpoint = path.split('?', 1)[0]
+        if endpoint not in ENDPOINTS:
+            # Path tak dikenal digabung agar jumlah label metrik tetap terbatas
+            endpoint = 'lainnya'
+        histogram = self.histograms.get(endpoint)
+        if histogram is None:
+            histogram = self.histograms[endpoint] = LatencyHistogram()
+        histogram.observe(time.perf_counter() - start)
+        self.responses[(endpoint, status)] = self.responses.get((endpoint, status), 0) + 1
+
+    def render_metrics(self) -> str:
+        """
+        Metrik layanan dalam format teks Prometheus
+        """
+        lines = ['# TYPE diagnosa_request_latency_seconds histogram']
+        for endpoint, histogram in sorted(self.histograms.items()):
+            lines.extend(histogram.render('diagnosa_request_latency_seconds', f'endpoint="{endpoint}"'))
+        lines.append('# TYPE diagnosa_responses_total counter')
+        for (endpoint, status), count in sorted(self.responses.items()):
+            lines.append(f'diagnosa_responses_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        cache = self.cache.stats()
+        lines.extend([
+            '# TYPE diagnosa_queue_depth gauge',
+            f'diagnosa_queue_depth {self.queue.qsize() if self.queue else 0}',
+            '# TYPE diagnosa_rejected_total counter',
+            f'diagnosa_rejected_total {self.rejected}',
+            '# TYPE diagnosa_cache_hits_total counter',
+            f'diagnosa_cache_hits_total {cache["hits"]}',
+            '# TYPE diagnosa_cache_misses_total counter',
+            f'diagnosa_cache_misses_total {cache["misses"]}',
+            '# TYPE diagnosa_kb_reload_total counter',
+            f'diagnosa_kb_reload_total{{hasil="berhasil"}} {self.watcher.swaps}',
+            f'diagnosa_kb_reload_total{{hasil="gagal"}} {self.watcher.failures}',
+        ])
+        text = '\n'.join(lines) + '\n'
+        if self.profiler is not None:
+            text += self.profiler.render_prometheus()
+        return text
+
+
+async def serve(args):
+    service = DiagnosisService(args.rules, args.workers, args.queue_size, args.concurrency, args.profil,
+                               None if args.no_reload else args.reload_interval)
+    server = await service.start(args.host, args.port)
+    print(f"Layanan diagnosa berjalan di http://{args.host}:{args.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    """
+    Fungsi utama untuk menjalankan layanan HTTP diagnosa
+    """
+    parser = argparse.ArgumentParser(description="Layanan HTTP/JSON diagnosa depresi")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--rules', default='rules.json', help="file basis pengetahuan")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah proses untuk batch")
+    parser.add_argument('--queue-size', type=int, default=1000, help="kapasitas antrean pekerjaan")
+    parser.add_argument('--concurrency', type=int, default=8, help="jumlah pekerjaan yang diproses bersamaan")
+    parser.add_argument('--profil', action='store_true', help="tambahkan statistik per aturan ke /metrics")
+    parser.add_argument('--reload-interval', type=float, default=1.0,
+                        help="detik antar pemeriksaan perubahan rules.json")
+    parser.add_argument('--no-reload', action='store_true', help="matikan hot reload rules.json")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from batch_runner import _diagnose_chunk, _init_worker, diagnose_records, validate_record
+from engine import load_shared_knowledge_base
+
+# Penanda akhir aliran pada antrean pembaca
+_END = object()
+
+
+def read_lines(file, offset: int = 0, line_no: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Membaca baris JSONL secara bertahap dari file biner. Menghasilkan
+    (offset byte setelah baris, nomor baris, isi baris). File yang dapat
+    di-seek langsung dilompati ke offset; aliran (stdin/pipe) dibuang
+    sebanyak offset byte. `line_no` adalah jumlah baris sebelum offset.
+    """
+    if offset:
+        if file.seekable():
+            file.seek(offset)
+        else:
+            remaining = offset
+            while remaining:
+                chunk = file.read(min(remaining, 1 << 16))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+    position = offset
+    while True:
+        line = file.readline()
+        if not line:
+            return
+        position += len(line)
+        line_no += 1
+        yield position, line_no, line
+
+
+def parse_lines(kb, lines: Iterable[Tuple[int, int, bytes]]) -> Iterator[Tuple[Tuple[int, int], Dict]]:
+    """
+    Mengubah baris JSONL menjadi ((offset, nomor baris), record) yang sudah divalidasi
+    """
+    for offset, line_no, line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            raw = json.loads(line.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            yield (offset, line_no), {'id': line_no, 'error': "Baris JSON tidak valid"}
+            continue
+        yield (offset, line_no), validate_record(kb, raw, line_no)
+
+
+def micro_batches(items: Iterable, size: int, max_wait: float,
+                  buffer: int = None) -> Iterator[List]:
+    """
+    Mengelompokkan aliran item menjadi micro-batch. Batch dikirim saat
+    berisi `size` item atau saat item pertamanya sudah menunggu `max_wait`
+    detik, sehingga aliran yang lambat tetap diproses tanpa jeda panjang.
+    Selama aliran diam, batch kosong dikirim setiap `max_wait` detik agar
+    pemanggil dapat mengirim hasil yang sudah selesai.
+    Item dibaca oleh thread terpisah ke antrean terbatas (`buffer`).
+    """
+    pending = queue.Queue(buffer or size * 2)
+
+    def reader():
+        try:
+            for item in items:
+                pending.put(item)
+        except BaseException as exc:
+            pending.put(exc)
+        pending.put(_END)
+
+    threading.Thread(target=reader, daemon=True).start()
+    batch: List = []
+    deadline = None
+    while True:
+        timeout = max_wait if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            item = pending.get(timeout=timeout)
+        except queue.Empty:
+            yield batch
+            batch, deadline = [], None
+            continue
+        if item is _END:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        batch.append(item)
+        if deadline is None:
+            deadline = time.monotonic() + max_wait
+        if len(batch) >= size:
+            yield batch
+            batch, deadline = [], None
+    if batch:
+        yield batch
+
+
+def diagnose_vectorized(kb, records: List[Dict]) -> List[Dict]:
+    """
+    Mendiagnosa satu micro-batch dengan jalur NumPy (vectorized.py).
+    Hasilnya sama dengan diagnose_records: record bertanda 'jelaskan'
+    (butuh DAG asal-usul dari infer) dan record error tetap lewat
+    diagnose_records.
+    """
+    import numpy as np
+    from vectorized import diagnose_batch
+
+    valid = [i for i, record in enumerate(records) if 'error' not in record and not record.get('jelaskan')]
+    if not valid:
+        return diagnose_records(kb, records)
+    codes = list(kb.indexes['gejala'])
+    nan = float('nan')
+    # Matriks dibangun dari list Python sekaligus; menulis sel satu per
+    # satu ke array NumPy jauh lebih lambat
+    matrix = np.array([[records[i]['facts'].get(kode, nan) for kode in codes] for i in valid],
+                      dtype=np.float64).reshape(len(valid), len(codes))
+    try:
+        batch = diagnose_batch(kb, matrix, [records[i]['gender'] for i in valid], codes)
+    except ValueError:
+        # Jaringan aturan bersiklus: kembali ke jalur skalar
+        return diagnose_records(kb, records)
+
+    results = dict(zip(valid, batch.all_results()))
+    scalar = iter(diagnose_records(kb, [record for i, record in enumerate(records) if i not in results]))
+    return [
+        {'id': record.get('id'), 'gender': record['gender'],
+         'hasil': [{'kode': kode, 'nama': nama, 'cf': cf} for kode, nama, cf in results[i]]}
+        if i in results else next(scalar)
+        for i, record in enumerate(records)
+    ]
+
+
+def run_pipeline(batches: Iterable[List[Tuple[Tuple[int, int], Dict]]], rules_file: str = "rules.json",
+                 mode: str = 'lokal', workers: int = None) -> Iterator[Tuple[Tuple[int, int], List[Dict]]]:
+    """
+    Mendiagnosa setiap micro-batch dan menghasilkan (posisi akhir batch,
+    hasil) sesuai urutan input. Mode 'lokal' memakai infer di proses ini,
+    'vektor' memakai jalur NumPy, dan 'pool' mengirim batch ke
+    ProcessPoolExecutor dengan jumlah batch dalam proses yang dibatasi.
+    """
+    if mode == 'pool':
+        workers = workers or os.cpu_count() or 1
+        # Thread pembaca micro_batches dapat sedang memegang lock stdin;
+        # worker hasil fork akan mewarisi lock tersebut dan macet saat
+        # menutup stdin, sehingga worker dibuat lewat forkserver/spawn
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(rules_file,)) as executor:
+            pending = deque()
+            for batch in batches:
+                if batch:
+                    future = executor.submit(_diagnose_chunk, [record for _, record in batch])
+                    pending.append((batch[-1][0], future))
+                if len(pending) >= workers * 2:
+                    position, future = pending.popleft()
+                    yield position, future.result()
+                # Hasil yang sudah selesai dikirim segera agar aliran tidak tertahan
+                while pending and pending[0][1].done():
+                    position, future = pending.popleft()
+                    yield position, future.result()
+            while pending:
+                position, future = pending.popleft()
+                yield position, future.result()
+        return
+
+    diagnose = diagnose_vectorized if mode == 'vektor' else diagnose_records
+    for batch in batches:
+        if batch:
+            kb = load_shared_knowledge_base(rules_file)
+            yield batch[-1][0], diagnose(kb, [record for _, record in batch])
+
+
+def read_checkpoint(path: str) -> Tuple[int, int]:
+    """
+    (offset byte, jumlah baris) input yang hasilnya sudah ditulis, (0, 0) jika belum ada
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return 0, 0
+    return int(checkpoint['offset']), int(checkpoint.get('baris', 0))
+
+
+def write_checkpoint(path: str, position: Tuple[int, int]):
+    """
+    Menulis checkpoint secara atomik (file sementara lalu os.replace)
+    """
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump({'offset': position[0], 'baris': position[1]}, file)
+    os.replace(temp_path, path)
+
+
+def main():
+    """
+    Fungsi utama pipeline diagnosa JSONL berkelanjutan
+    """
+    parser = argparse.ArgumentParser(description="Pipeline diagnosa aliran JSONL berkelanjutan")
+    parser.add_argument('input', nargs='?', default='-', help="file JSONL masukan, '-' untuk stdin")
+    parser.add_argument('--output', '-o', default='-', help="file JSONL hasil, default stdout")
+    parser.add_argument('--rules', default='rules.json', help="file basis pengetahuan")
+    parser.add_argument('--mode', choices=('lokal', 'vektor', 'pool'), default='lokal',
+                        help="jalur inferensi per micro-batch")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah proses untuk mode pool")
+    parser.add_argument('--batch', type=int, default=256, help="ukuran maksimum micro-batch")
+    parser.add_argument('--max-tunggu', type=float, default=0.2,
+                        help="detik maksimum record menunggu sebelum batch dikirim")
+    parser.add_argument('--checkpoint', default=None, help="file checkpoint offset byte input")
+    parser.add_argument('--offset', type=int, default=None,
+                        help="mulai dari offset byte ini (default: dari checkpoint, atau 0)")
+    args = parser.parse_args()
+
+    if args.offset is not None:
+        offset, line_no = args.offset, 0
+    elif args.checkpoint:
+        offset, line_no = read_checkpoint(args.checkpoint)
+    else:
+        offset, line_no = 0, 0
+
+    kb = load_shared_knowledge_base(args.rules)
+    if kb.compiled is None and not kb.data:
+        sys.exit(1)
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    # Saat melanjutkan, hasil ditambahkan ke file keluaran yang sudah ada
+    if args.output == '-':
+        output = sys.stdout
+    else:
+        output = open(args.output, 'a' if offset else 'w', encoding='utf-8')
+    try:
+        items = parse_lines(kb, read_lines(source, offset, line_no))
+        batches = micro_batches(items, args.batch, args.max_tunggu)
+        for position, results in run_pipeline(batches, args.rules, args.mode, args.workers):
+            for result in results:
+                output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+            # Checkpoint ditulis setelah hasil batch tersimpan (at-least-once)
+            if args.checkpoint:
+                write_checkpoint(args.checkpoint, position)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from batch_runner import parse_record, read_records, validate_record
+from engine import KnowledgeBase
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+
+@pytest.mark.parametrize('facts', [['G1', 'G2'], 'G1', None, 1])
+def test_non_object_facts_is_record_error(facts):
+    record = parse_record({'id': 'p1', 'gender': 'pria', 'facts': facts}, 1)
+    assert record['id'] == 'p1'
+    assert 'error' in record
+
+
+@pytest.mark.parametrize('raw', [['G1'], 'pria', None, 3])
+def test_non_object_record_is_record_error(raw):
+    assert parse_record(raw, 7) == {'id': 7, 'error': "Record harus berupa objek JSON"}
+
+
+def test_valid_record():
+    record = parse_record({'id': 'p1', 'gender': 'Laki-laki', 'facts': {'G1': '0.8', 'G2': None}}, 1)
+    assert record == {'id': 'p1', 'gender': 'pria', 'facts': {'G1': 0.8}}
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.load(RULES_FILE, use_compiled=False)
+
+
+@pytest.mark.parametrize('facts, error', [
+    ({'G1': 'nan'}, "CF gejala G1 harus di antara -1 dan 1: nan"),
+    ({'G1': float('inf')}, "CF gejala G1 harus di antara -1 dan 1: inf"),
+    ({'G1': 5}, "CF gejala G1 harus di antara -1 dan 1: 5.0"),
+    ({'G1': -1e9}, "CF gejala G1 harus di antara -1 dan 1: -1000000000.0"),
+    ({'G1': 0.8, 'X99': 0.4}, "Kode gejala tidak dikenal: X99"),
+    ({'D1': 1.0}, "Kode gejala tidak dikenal: D1"),
+])
+def test_validate_record_rejects_invalid_facts(kb, facts, error):
+    record = validate_record(kb, {'id': 'p1', 'gender': 'pria', 'facts': facts}, 1)
+    assert record == {'id': 'p1', 'error': error}
+
+
+def test_validate_record_accepts_valid_record(kb):
+    record = validate_record(kb, {'id': 'p1', 'gender': 'wanita', 'G1': '-1', 'G2': '1', 'jelaskan': 'ya'}, 1)
+    assert record == {'id': 'p1', 'gender': 'wanita', 'facts': {'G1': -1.0, 'G2': 1.0}, 'jelaskan': True}
+
+
+def test_read_records_validates_each_line(kb, tmp_path):
+    path = tmp_path / 'data.jsonl'
+    path.write_text('{"id": 1, "gender": "pria", "facts": {"G1": 0.8}}\n'
+                    '{"id": 2, "gender": "pria", "facts": {"G1": 1.5}}\n', encoding='utf-8')
+    records = list(read_records(str(path), kb))
+    assert records[0]['facts'] == {'G1': 0.8}
+    assert 'error' in records[1]
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from engine import (DepressionExpertSystem, DiagnosisCache, KnowledgeBase, RuleProfiler, TraceRecorder, infer,
+                    load_shared_knowledge_base)
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+# Pria: R1_P (G2, G3, G4 -> D1) dan R3_P (G12..G18 -> D3) menyala,
+# sehingga R8 (D1 + D3 -> K1) ikut menyala. G16 ber-CF pakar negatif,
+# jadi jawaban -1 menghasilkan CF gejala positif.
+FAKTA_D1_D3 = {
+    'G2': 1.0, 'G3': 1.0, 'G4': 1.0,
+    'G12': 1.0, 'G13': 1.0, 'G14': 1.0, 'G15': 1.0, 'G16': -1.0, 'G17': 1.0, 'G18': 1.0,
+}
+
+
+@pytest.fixture(scope='module')
+def kb():
+    return KnowledgeBase.load(RULES_FILE, use_compiled=False)
+
+
+def test_chained_rule_fires_on_derived_conclusions(kb):
+    conclusions = infer(kb, 'pria', FAKTA_D1_D3)
+    d1 = min(0.8, 0.8, 0.8) * 0.8
+    d3 = min(0.4, 0.8, 0.8, 0.6, 0.4, 0.8, 0.8) * 0.8
+    assert conclusions['D1'] == pytest.approx(d1)
+    assert conclusions['D3'] == pytest.approx(d3)
+    assert conclusions['K1'] == pytest.approx(min(d1, d3) * 0.6)
+    assert list(conclusions) == ['D1', 'D3', 'K1']
+
+
+def test_each_rule_fires_once(kb):
+    trace = TraceRecorder()
+    infer(kb, 'pria', FAKTA_D1_D3, trace)
+    fired = [data['rule_id'] for event, data in trace.events if event == 'aturan']
+    assert sorted(fired) == ['R1_P', 'R3_P', 'R8']
+
+
+def test_repeated_runs_do_not_drift(kb):
+    first = infer(kb, 'pria', FAKTA_D1_D3)
+    for _ in range(5):
+        assert infer(kb, 'pria', FAKTA_D1_D3) == first
+
+    system = DepressionExpertSystem(RULES_FILE, knowledge_base=kb)
+    system.set_gender('pria')
+    for kode, cf in FAKTA_D1_D3.items():
+        system.add_fact(kode, cf)
+    assert system.forward_chaining() == first
+    assert system.forward_chaining() == first
+
+
+def test_chained_rule_needs_all_derived_premises(kb):
+    fakta = {kode: cf for kode, cf in FAKTA_D1_D3.items() if kode not in ('G12', 'G13')}
+    conclusions = infer(kb, 'pria', fakta)
+    assert 'D1' in conclusions
+    assert 'D3' not in conclusions
+    assert 'K1' not in conclusions
+
+
+def test_negative_rule_cf_does_not_fire(kb):
+    conclusions = infer(kb, 'pria', dict(FAKTA_D1_D3, G2=-1.0))
+    assert 'D1' not in conclusions
+    assert 'K1' not in conclusions
+
+
+def test_update_after_cache_hit_stays_incremental(kb):
+    cache = DiagnosisCache()
+    for _ in range(2):
+        system = DepressionExpertSystem(RULES_FILE, knowledge_base=kb, cache=cache)
+        system.set_gender('pria')
+        for kode, cf in FAKTA_D1_D3.items():
+            system.add_fact(kode, cf)
+        system.forward_chaining()
+    assert cache.hits == 1
+    assert system._contributions is not None
+
+    system.update_fact('G12', 0.4)
+    assert system._contributions is not None
+    assert system.conclusions == infer(kb, 'pria', system.facts)
+    system.retract_fact('G2')
+    assert system.conclusions == infer(kb, 'pria', system.facts)
+    assert 'K1' not in system.conclusions
+
+
+def test_cache_ignores_stale_knowledge_base(kb):
+    old = KnowledgeBase(kb.data, version='lama')
+    new = KnowledgeBase(kb.data, version='baru')
+    cache = DiagnosisCache()
+    cache.put(old, 'pria', {'G2': 1.0}, {'D1': 0.5})
+    cache.put(new, 'pria', {'G2': 1.0}, {'D1': 0.6})
+    assert cache.get(new, 'pria', {'G2': 1.0}) == {'D1': 0.6}
+
+    # Diagnosa yang masih berjalan dengan versi lama tidak mengosongkan cache
+    assert cache.get(old, 'pria', {'G2': 1.0}) is None
+    cache.put(old, 'pria', {'G2': 1.0}, {'D1': 0.5})
+    assert cache.get(new, 'pria', {'G2': 1.0}) == {'D1': 0.6}
+    assert cache.stats()['versi_kb'] == 'baru'
+
+    # Isi lama yang dimuat ulang (mis. rules.json dikembalikan) dipakai lagi
+    reverted = KnowledgeBase(kb.data, version='lama')
+    assert cache.get(reverted, 'pria', {'G2': 1.0}) is None
+    assert cache.stats()['versi_kb'] == 'lama'
+
+
+def test_profiler_labels_run_without_gender_as_umum(kb):
+    profiler = RuleProfiler()
+    infer(kb, 'pria', FAKTA_D1_D3, profiler=profiler)
+    infer(kb, None, {'D1': 1.0, 'D3': 1.0}, profiler=profiler)
+    assert {jaringan for jaringan, _ in profiler.stats} == {'pria', 'umum'}
+    assert all(item['jaringan'] is not None for item in profiler.to_dict()['aturan'])
+    assert 'jaringan="umum",aturan="R8"' in profiler.render_prometheus()
+
+
+@pytest.mark.parametrize('content', ['{"gejala": [', 'invalid-kb'])
+def test_shared_knowledge_base_keeps_last_valid_version(tmp_path, capsys, content):
+    path = str(tmp_path / 'rules.json')
+    shutil.copyfile(RULES_FILE, path)
+    good = load_shared_knowledge_base(path)
+
+    if content == 'invalid-kb':
+        with open(RULES_FILE, encoding='utf-8') as file:
+            data = json.load(file)
+        data['gejala'][0]['cf_pakar'] = 5
+        content = json.dumps(data)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+    os.utime(path, ns=(1, 1))
+    capsys.readouterr()
+    assert load_shared_knowledge_base(path) is good
+    assert load_shared_knowledge_base(path) is good
+    # File yang sama hanya dibaca dan dilaporkan sekali
+    assert capsys.readouterr().out.count('ditolak') == 1
+
+    shutil.copyfile(RULES_FILE, path)
+    reloaded = load_shared_knowledge_base(path)
+    assert reloaded is not good
+    assert reloaded.version == good.version
@@ -0,0 +1,117 @@
+"""
+Jalur inferensi alternatif (infer_top, pembaruan inkremental, tabel CF dan
+diagnosa batch NumPy) harus memberi hasil yang sama dengan infer() pada
+rules.json dan pada basis pengetahuan sintetis berantai.
+"""
+import os
+import random
+
+import pytest
+
+from cf_tables import CF_LEVELS, TableDiagnoser, compile_tables
+from engine import DepressionExpertSystem, KnowledgeBase, infer, infer_top
+from generate_kb import generate_knowledge_base, generate_patients
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+N_PATIENTS = 300
+
+
+def _synthetic_kb() -> KnowledgeBase:
+    # Premis dibatasi agar tabel CF (5^k entri per aturan) tetap kecil
+    data = generate_knowledge_base(n_gejala=40, n_penyakit=10, n_komplikasi=6, n_pria=20, n_wanita=20,
+                                   n_layers=3, rules_per_layer=4, premis=(2, 5), fan_in=(2, 3), seed=7)
+    return KnowledgeBase(data)
+
+
+@pytest.fixture(scope='module', params=['rules.json', 'sintetis'])
+def kb(request):
+    if request.param == 'rules.json':
+        return KnowledgeBase.load(RULES_FILE, use_compiled=False)
+    return _synthetic_kb()
+
+
+@pytest.fixture(scope='module')
+def patients(kb):
+    # Pasien dari generate_patients jarang memenuhi semua premis aturan;
+    # separuhnya diganti pasien yang hampir semua gejalanya searah CF pakar
+    # agar aturan berantai dan kombinasi paralel ikut teruji
+    result = list(generate_patients(kb.data, N_PATIENTS // 2, seed=11))
+    rng = random.Random(13)
+    for i in range(N_PATIENTS - len(result)):
+        facts = {}
+        for kode, gejala in kb.indexes['gejala'].items():
+            if rng.random() < 0.9:
+                cf = rng.choice(CF_LEVELS if rng.random() < 0.1 else (0.8, 0.4))
+                facts[kode] = -cf if gejala['cf_pakar'] < 0 else cf
+        result.append({'id': f's{i}', 'gender': rng.choice(['pria', 'wanita']), 'facts': facts})
+    return result
+
+
+@pytest.mark.parametrize('top_k', [None, 1, 3])
+@pytest.mark.parametrize('min_cf', [None, 0.4, 0.8])
+def test_infer_top_matches_infer(kb, patients, top_k, min_cf):
+    for patient in patients:
+        conclusions = infer(kb, patient['gender'], patient['facts'])
+        expected = kb.diagnosis_results(conclusions, top_k, min_cf)
+        _, results = infer_top(kb, patient['gender'], patient['facts'], top_k, min_cf)
+        # Hasil ber-CF sama boleh berbeda urutan (dan pilihan di batas top_k)
+        assert [cf for _, _, cf in results] == [cf for _, _, cf in expected]
+        for kode, _, cf in results:
+            assert conclusions[kode] == cf
+
+
+def test_incremental_updates_match_infer(kb, patients):
+    rng = random.Random(3)
+    codes = list(kb.indexes['gejala'])
+    for patient in patients[:100]:
+        system = DepressionExpertSystem(knowledge_base=kb)
+        system.set_gender(patient['gender'])
+        for kode, cf in patient['facts'].items():
+            system.add_fact(kode, cf)
+        system.forward_chaining()
+        for _ in range(10):
+            kode = rng.choice(codes)
+            if kode in system.facts and rng.random() < 0.5:
+                system.retract_fact(kode)
+            else:
+                system.update_fact(kode, rng.choice(CF_LEVELS))
+            expected = infer(kb, system.gender, system.facts)
+            assert system.conclusions == expected
+            assert list(system.conclusions) == list(expected)
+
+
+def test_table_diagnoser_matches_infer(kb, patients):
+    diagnoser = TableDiagnoser(kb, compile_tables(kb))
+    for patient in patients:
+        expected = infer(kb, patient['gender'], patient['facts'])
+        conclusions = diagnoser.diagnose(patient['gender'], patient['facts'])
+        assert conclusions == expected
+        assert list(conclusions) == list(expected)
+
+
+def test_diagnose_batch_matches_infer(kb, patients):
+    np = pytest.importorskip('numpy')
+    from vectorized import diagnose_batch
+
+    codes = list(kb.indexes['gejala'])
+    matrix = np.array([[patient['facts'].get(kode, np.nan) for kode in codes] for patient in patients])
+    batch = diagnose_batch(kb, matrix, [patient['gender'] for patient in patients], codes)
+    all_results = batch.all_results()
+    for i, patient in enumerate(patients):
+        expected = infer(kb, patient['gender'], patient['facts'])
+        assert batch.conclusions(i) == expected
+        assert list(batch.conclusions(i)) == list(expected)
+        assert all_results[i] == kb.diagnosis_results(expected)
+
+
+@pytest.mark.parametrize('scale', [2.0, 5.0, float('nan')])
+def test_infer_top_out_of_range_cf_matches_infer(kb, patients, scale):
+    # Batas atas pemangkasan menganggap |CF_user| <= 1; di luar itu infer_top
+    # harus kembali ke inferensi penuh
+    for patient in patients[:50]:
+        facts = {kode: cf * scale for kode, cf in patient['facts'].items()}
+        conclusions = infer(kb, patient['gender'], facts)
+        for top_k, min_cf in ((None, 0.8), (1, None), (3, 0.4)):
+            expected = kb.diagnosis_results(conclusions, top_k, min_cf)
+            _, results = infer_top(kb, patient['gender'], facts, top_k, min_cf)
+            assert [cf for _, _, cf in results] == [cf for _, _, cf in expected]
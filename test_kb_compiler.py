@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import pytest
+
+from engine import KnowledgeBase, infer, infer_top
+from kb_compiler import MappedKnowledgeBase, compiled_path, load_compiled, write_compiled
+from test_engine import FAKTA_D1_D3
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+
+@pytest.fixture()
+def rules_file(tmp_path):
+    path = str(tmp_path / 'rules.json')
+    shutil.copyfile(RULES_FILE, path)
+    write_compiled(KnowledgeBase.load(path, use_compiled=False), compiled_path(path))
+    return path
+
+
+def test_mapped_knowledge_base_matches_json(rules_file):
+    expected = KnowledgeBase.load(rules_file, use_compiled=False)
+    kb = KnowledgeBase.load(rules_file)
+    assert isinstance(kb, MappedKnowledgeBase)
+    assert kb.version == expected.version
+
+    conclusions = infer(kb, 'pria', FAKTA_D1_D3)
+    assert conclusions == infer(expected, 'pria', FAKTA_D1_D3)
+    assert list(conclusions) == ['D1', 'D3', 'K1']
+    assert kb.diagnosis_results(conclusions) == expected.diagnosis_results(conclusions)
+    assert infer_top(kb, 'wanita', FAKTA_D1_D3, 2) == infer_top(expected, 'wanita', FAKTA_D1_D3, 2)
+
+    assert kb.symbols == expected.symbols
+    assert kb.gejala_cf == expected.gejala_cf
+    for section, index in expected.indexes.items():
+        assert dict(kb.indexes[section]) == index
+    for key, network in expected.rule_networks.items():
+        mapped = kb.rule_networks[key]
+        assert list(mapped.order) == list(network.order)
+        assert list(mapped.premise_counts) == list(network.premise_counts)
+        assert dict(mapped.index) == dict(network.index)
+        assert dict(mapped.producers) == dict(network.producers)
+        assert mapped.strata == network.strata
+        assert [(rule.id, rule.premis, rule.maka, rule.cf_rule) for rule in mapped.rules] == \
+            [(rule.id, rule.premis, rule.maka, rule.cf_rule) for rule in network.rules]
+    assert kb.data == expected.data
+
+
+def test_stale_artifact_is_ignored(rules_file):
+    with open(rules_file, 'a') as file:
+        file.write('\n')
+    os.utime(rules_file, ns=(0, 0))
+    assert load_compiled(rules_file) is None
+    assert not isinstance(KnowledgeBase.load(rules_file), MappedKnowledgeBase)
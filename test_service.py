@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from service import DiagnosisService
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data: bytes):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+def request(service, method, path, body=b''):
+    async def run():
+        status, payload = await service.route(method, path, body)
+        await service._respond(FakeWriter(), path, status, payload, 0.0)
+        return status, payload
+    return asyncio.run(run())
+
+
+def test_bad_input_is_400():
+    service = DiagnosisService(RULES_FILE)
+    status, payload = request(service, 'POST', '/diagnosa', b'{"gender": "pria", "facts": ["G1"]}')
+    assert status == 400 and 'error' in payload
+    status, payload = request(service, 'POST', '/diagnosa/batch', b'{"pasien": "G1"}')
+    assert status == 400
+    assert service.responses[('/diagnosa', 400)] == 1
+    assert service.responses[('/diagnosa/batch', 400)] == 1
+
+
+def test_unexpected_errors_are_500_json():
+    service = DiagnosisService(RULES_FILE)
+
+    async def broken_bug(body):
+        raise AttributeError('bug')
+
+    async def broken_pool(body):
+        raise BrokenProcessPool('worker mati')
+
+    service.handle_health = broken_bug
+    status, payload = request(service, 'GET', '/health')
+    assert status == 500 and 'error' in payload
+    service.handle_batch = broken_pool
+    status, payload = request(service, 'POST', '/diagnosa/batch', b'{"pasien": []}')
+    assert status == 500 and 'error' in payload
+    assert service.responses[('/health', 500)] == 1
+    assert service.responses[('/diagnosa/batch', 500)] == 1
+    assert 'diagnosa_responses_total{endpoint="/health",status="500"} 1' in service.render_metrics()
+
+
+def test_invalid_facts_are_400():
+    service = DiagnosisService(RULES_FILE)
+    for facts in (b'{"G1": "nan"}', b'{"G1": 5}', b'{"G1": 1e9}', b'{"X99": 0.8}'):
+        status, payload = request(service, 'POST', '/diagnosa', b'{"gender": "pria", "facts": ' + facts + b'}')
+        assert status == 400 and 'error' in payload
+    assert service.responses[('/diagnosa', 400)] == 4
+    assert service.cache.stats()['size'] == 0
+
+
+def test_batch_is_split_across_workers_in_order():
+    service = DiagnosisService(RULES_FILE, workers=2)
+    pasien = [{'id': i, 'gender': 'pria' if i % 2 else 'wanita', 'facts': {'G2': 1.0, 'G3': 1.0, 'G4': 1.0}}
+              for i in range(150)]
+
+    async def run():
+        service.queue = asyncio.Queue()
+        service._replace_pool(service.kb)
+        task = asyncio.ensure_future(service._worker())
+        try:
+            return await service.route('POST', '/diagnosa/batch', json.dumps({'pasien': pasien}).encode())
+        finally:
+            task.cancel()
+            service.pool.shutdown()
+
+    status, payload = asyncio.run(run())
+    assert status == 200
+    assert [item['id'] for item in payload['hasil']] == list(range(150))
+    assert payload['hasil'][1]['hasil'] == payload['hasil'][3]['hasil']
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from batch_runner import diagnose_records, validate_record
+from engine import KnowledgeBase
+from stream_pipeline import diagnose_vectorized
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+
+def test_vectorized_matches_local_including_provenance():
+    pytest.importorskip('numpy')
+    kb = KnowledgeBase.load(RULES_FILE, use_compiled=False)
+    facts = {'G2': 1.0, 'G3': 1.0, 'G4': 1.0, 'G12': 1.0, 'G13': 1.0}
+    raws = [
+        {'id': 1, 'gender': 'pria', 'facts': facts},
+        {'id': 2, 'gender': 'pria', 'facts': facts, 'jelaskan': True},
+        {'id': 3, 'gender': 'pria', 'facts': {'G1': 5}},
+        {'id': 4, 'gender': 'wanita', 'facts': facts, 'jelaskan': True},
+    ]
+    records = [validate_record(kb, raw, i) for i, raw in enumerate(raws, 1)]
+    output = diagnose_vectorized(kb, records)
+    assert output == diagnose_records(kb, records)
+    assert 'provenance' in output[1] and 'provenance' in output[3]
+    assert 'provenance' not in output[0]
@@ -0,0 +1,197 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from engine import normalize_gender
+
+
+class BatchDiagnosis:
+    """
+    Hasil diagnosa batch: matriks CF kesimpulan (pasien x kesimpulan).
+    NaN berarti kesimpulan tidak diperoleh untuk pasien tersebut.
+    """
+    def __init__(self, kb, codes: List[str], cf: np.ndarray, first_rank: np.ndarray):
+        self.kb = kb
+        self.codes = codes
+        self.cf = cf
+        # Urutan pertama kali kesimpulan diperoleh, sama dengan urutan
+        # penyisipan ke dictionary conclusions pada jalur skalar
+        self.first_rank = first_rank
+        # Hasil per pasien dibaca dari array dalam satu langkah untuk
+        # seluruh batch saat pertama kali diminta
+        self._conclusions = None
+        self._results = None
+
+    def __len__(self) -> int:
+        return self.cf.shape[0]
+
+    def conclusions(self, i: int) -> Dict[str, float]:
+        """
+        Kesimpulan pasien ke-i, setara dengan hasil forward_chaining
+        """
+        if self._conclusions is None:
+            self._conclusions = self.all_conclusions()
+        return self._conclusions[i]
+
+    def results(self, i: int) -> List[Tuple[str, str, float]]:
+        """
+        Hasil diagnosa pasien ke-i, setara dengan get_diagnosis_results
+        """
+        if self._results is None:
+            self._results = self.all_results()
+        return self._results[i]
+
+    def all_conclusions(self) -> List[Dict[str, float]]:
+        """
+        Kesimpulan semua pasien. Urutan per baris dihitung dengan satu
+        argsort untuk seluruh batch, lalu dibaca sebagai list Python
+        """
+        found = ~np.isnan(self.cf)
+        order = np.argsort(self.first_rank, axis=1, kind='stable')
+        values = np.take_along_axis(self.cf, order, axis=1).tolist()
+        counts = found.sum(axis=1).tolist()
+        codes = self.codes
+        return [{codes[c]: v for c, v in zip(row_order[:n], row_values[:n])}
+                for row_order, row_values, n in zip(order.tolist(), values, counts)]
+
+    def all_results(self) -> List[List[Tuple[str, str, float]]]:
+        """
+        Hasil diagnosa semua pasien: diurutkan berdasarkan CF (tertinggi
+        dulu), CF sama mengikuti urutan kesimpulan diperoleh. Pengurutan
+        dilakukan sekali untuk seluruh batch dengan np.lexsort.
+        """
+        # Nama hasil per kolom kesimpulan; kode tanpa info tidak ditampilkan
+        names = {kode: nama for kode, nama, _ in
+                 self.kb.diagnosis_results(dict.fromkeys(self.codes, 0.0))}
+        shown = np.array([kode in names for kode in self.codes], dtype=bool)
+        found = ~np.isnan(self.cf) & shown
+        key = np.where(found, -self.cf, np.inf)
+        order = np.lexsort((self.first_rank, key), axis=-1)
+        values = np.take_along_axis(self.cf, order, axis=1).tolist()
+        counts = found.sum(axis=1).tolist()
+        columns = [(kode, names.get(kode)) for kode in self.codes]
+        return [[columns[c] + (v,) for c, v in zip(row_order[:n], row_values[:n])]
+                for row_order, row_values, n in zip(order.tolist(), values, counts)]
+
+
+def diagnose_batch(kb, cf_matrix, genders: Sequence[str],
+                   symptom_codes: List[str] = None) -> BatchDiagnosis:
+    """
+    Diagnosa banyak pasien sekaligus.
+
+    cf_matrix berukuran (pasien x gejala) berisi CF user; NaN berarti gejala
+    tidak dimasukkan. Kolom mengikuti symptom_codes, atau urutan gejala pada
+    basis pengetahuan jika tidak diberikan. CF_pakar x CF_user, reduksi
+    minimum premis, skala cf_rule dan kombinasi CF paralel dihitung sebagai
+    operasi array per aturan, dengan urutan aturan yang sama seperti
+    forward_chaining sehingga hasilnya identik dengan jalur skalar.
+    """
+    cf_user = np.asarray(cf_matrix, dtype=np.float64)
+    if cf_user.ndim != 2:
+        raise ValueError("cf_matrix harus berdimensi 2 (pasien x gejala)")
+    if symptom_codes is None:
+        symptom_codes = [gejala['kode'] for gejala in kb.data.get('gejala', [])]
+    if cf_user.shape[1] != len(symptom_codes):
+        raise ValueError("Jumlah kolom cf_matrix tidak sama dengan jumlah gejala")
+    if len(genders) != cf_user.shape[0]:
+        raise ValueError("Panjang vektor gender tidak sama dengan jumlah pasien")
+
+    columns = {kode: j for j, kode in enumerate(symptom_codes)}
+    cf_pakar = np.array([kb.get_gejala_info(kode).get('cf_pakar', 0.0)
+                         for kode in symptom_codes], dtype=np.float64)
+    present = ~np.isnan(cf_user)
+    cf_gejala = cf_pakar * cf_user
+
+    # Semua kode kesimpulan dari seluruh jaringan aturan, urutan kemunculan
+    # pertama dipertahankan (dict.fromkeys: linear, bukan scan list per aturan)
+    codes: List[str] = list(dict.fromkeys(
+        rule.maka for network in kb.rule_networks.values() for rule in network.rules))
+    conclusion_columns = {kode: c for c, kode in enumerate(codes)}
+
+    n_patients = cf_user.shape[0]
+    cf = np.full((n_patients, len(codes)), np.nan)
+    first_rank = np.full((n_patients, len(codes)), np.iinfo(np.int64).max, dtype=np.int64)
+
+    normalized = [normalize_gender(gender) for gender in genders]
+    for gender, network in kb.rule_networks.items():
+        rows = np.array([i for i, g in enumerate(normalized) if g == gender], dtype=np.intp)
+        if not rows.size:
+            continue
+        if not network.acyclic:
+            raise ValueError("Jaringan aturan mengandung siklus; gunakan forward_chaining")
+        group_cf, group_present, group_rank = _run_network(
+            network, present[rows], cf_gejala[rows], columns, conclusion_columns)
+        cf[rows] = np.where(group_present, group_cf, np.nan)
+        first_rank[rows] = group_rank
+
+    return BatchDiagnosis(kb, codes, cf, first_rank)
+
+
+def _run_network(network, fact_present: np.ndarray, fact_cf: np.ndarray,
+                 columns: Dict[str, int], conclusion_columns: Dict[str, int]):
+    """
+    Mengevaluasi satu jaringan aturan untuk sekelompok pasien bergender sama
+    """
+    n_patients = fact_present.shape[0]
+    n_conclusions = len(conclusion_columns)
+    conclusion_present = np.zeros((n_patients, n_conclusions), dtype=bool)
+    conclusion_cf = np.zeros((n_patients, n_conclusions), dtype=np.float64)
+    first_rank = np.full((n_patients, n_conclusions), np.iinfo(np.int64).max, dtype=np.int64)
+
+    for rank, idx in enumerate(network.order):
+        rule = network.rules[idx]
+        premis = network.premises[idx]
+        if not premis:
+            # Aturan tanpa premis selalu menghasilkan CF 0 dan tidak pernah aktif
+            continue
+
+        satisfied = np.ones(n_patients, dtype=bool)
+        cf_premis = []
+        for kode in premis:
+            j = columns.get(kode)
+            c = conclusion_columns.get(kode)
+            if j is None and c is None:
+                satisfied[:] = False
+                break
+            if j is None:
+                kode_present = conclusion_present[:, c]
+                kode_cf = conclusion_cf[:, c]
+            elif c is None:
+                kode_present = fact_present[:, j]
+                kode_cf = fact_cf[:, j]
+            else:
+                # Fakta didahulukan daripada kesimpulan, seperti calculate_cf_rule
+                kode_present = fact_present[:, j] | conclusion_present[:, c]
+                kode_cf = np.where(fact_present[:, j], fact_cf[:, j], conclusion_cf[:, c])
+            satisfied &= kode_present
+            cf_premis.append(kode_cf)
+        if not satisfied.any():
+            continue
+
+        with np.errstate(invalid='ignore'):
+            cf_rule = np.minimum.reduce(cf_premis) * rule.cf_rule
+            fire = satisfied & (cf_rule > 0)
+        if not fire.any():
+            continue
+
+        c = conclusion_columns[rule.maka]
+        old_present = conclusion_present[:, c]
+        old_cf = conclusion_cf[:, c]
+        combined = np.where(old_present, _combine_cf_parallel(old_cf, cf_rule), cf_rule)
+        conclusion_cf[:, c] = np.where(fire, combined, old_cf)
+        first_rank[:, c] = np.where(fire & ~old_present, rank, first_rank[:, c])
+        conclusion_present[:, c] = old_present | fire
+
+    return conclusion_cf, conclusion_present, first_rank
+
+
+def _combine_cf_parallel(cf1: np.ndarray, cf2: np.ndarray) -> np.ndarray:
+    """
+    Versi array dari engine.combine_cf_parallel
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        both_positive = cf1 + cf2 - (cf1 * cf2)
+        both_negative = cf1 + cf2 + (cf1 * cf2)
+        mixed = (cf1 + cf2) / (1 - np.minimum(np.abs(cf1), np.abs(cf2)))
+    return np.where((cf1 >= 0) & (cf2 >= 0), both_positive,
+                    np.where((cf1 <= 0) & (cf2 <= 0), both_negative, mixed))